@@ -12,8 +12,10 @@ from dbvpra.assert_util.util import *
 
 __all__ = [
     'assert_rgb_image',
+    'assert_rgb_images',
     'assert_rgba_image',
     'assert_a_image',
+    'assert_image',
     'assert_mask',
     'assert_image_mask',
     'assert_kernel',
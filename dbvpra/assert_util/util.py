@@ -10,23 +10,36 @@
 
 import numpy as np
 
+# the element types images may have, uint8 images are interpreted as [0, 255]
+_IMAGE_DTYPES = (np.float64, np.float32, np.uint8)
+
 
 def assert_rgb_image(image: np.ndarray):
     """
     :param image: the image to check for its properties
     """
-    assert type(image) == np.ndarray, "The Image needs to be a numpy.ndarray!"
-    assert image.dtype == np.float64, "The Image elements to be a float!"
+    assert isinstance(image, np.ndarray), "The Image needs to be a numpy.ndarray!"
+    assert image.dtype in _IMAGE_DTYPES, "The Image elements need to be a float64, float32 or uint8!"
     assert len(image.shape) == 3, "The Image needs to have a dimension of three!"
     assert image.shape[2] == 3, "The Image needs to have three color channels!"
 
 
+def assert_rgb_images(images: np.ndarray):
+    """
+    :param images: the stack of images to check for its properties
+    """
+    assert isinstance(images, np.ndarray), "The Images need to be a numpy.ndarray!"
+    assert images.dtype in _IMAGE_DTYPES, "The Image elements need to be a float64, float32 or uint8!"
+    assert len(images.shape) == 4, "The Images need to have a dimension of four!"
+    assert images.shape[3] == 3, "The Images need to have three color channels!"
+
+
 def assert_rgba_image(image: np.ndarray):
     """
     :param image: the image to check for its properties
     """
-    assert type(image) == np.ndarray, "The Image needs to be a numpy.ndarray!"
-    assert image.dtype == np.float64, "The Image elements to be a float!"
+    assert isinstance(image, np.ndarray), "The Image needs to be a numpy.ndarray!"
+    assert image.dtype in _IMAGE_DTYPES, "The Image elements need to be a float64, float32 or uint8!"
     assert len(image.shape) == 3, "The Image needs to have a dimension of three!"
     assert image.shape[2] == 4, "The Image needs to have four color channels!"
 
@@ -35,17 +48,26 @@ def assert_a_image(image: np.ndarray):
     """
     :param image: the image to check for its properties
     """
-    assert type(image) == np.ndarray, "The Image needs to be a numpy.ndarray!"
-    assert image.dtype == np.float64, "The Image elements to be a float!"
+    assert isinstance(image, np.ndarray), "The Image needs to be a numpy.ndarray!"
+    assert image.dtype in _IMAGE_DTYPES, "The Image elements need to be a float64, float32 or uint8!"
     assert len(image.shape) == 3, "The Image needs to have a dimension of three!"
     assert image.shape[2] == 1, "The Image needs to have only one alpha channel!"
 
 
+def assert_image(image: np.ndarray):
+    """
+    :param image: the single channel or multi channel image to check for its properties
+    """
+    assert isinstance(image, np.ndarray), "The Image needs to be a numpy.ndarray!"
+    assert image.dtype in _IMAGE_DTYPES, "The Image elements need to be a float64, float32 or uint8!"
+    assert len(image.shape) in (2, 3), "The Image needs to have a dimension of two or three!"
+
+
 def assert_mask(mask: np.ndarray):
     """
     :param mask: the mask to check for its properties
     """
-    assert type(mask) == np.ndarray, "The Mask needs to be a numpy.ndarray!"
+    assert isinstance(mask, np.ndarray), "The Mask needs to be a numpy.ndarray!"
     assert mask.dtype == np.bool_, "The Mask needs to be a bool mask!"
     assert len(mask.shape) == 2, "The Mask needs to have a dimension of two!"
 
@@ -15,8 +15,8 @@ from PySide2.QtCore import QUrl
 from PySide2.QtWidgets import QMainWindow, QFileDialog, QWidget
 
 from dbvpra.gui.Ui_window import Ui_window
-from dbvpra.inpainting import poisson
-from dbvpra.segmentation import nn_segmentation_from_masks
+from dbvpra.inpainting import poisson, FactorizationCache
+from dbvpra.segmentation import nn_segmentation_from_masks, SegmentationCache
 
 
 def res_dir_path() -> str:
@@ -43,13 +43,21 @@ class Control_window:
 
     def setupControl(self, ui: Ui_window, window: QMainWindow):
         kernel_size = 3
+        factorization_cache = FactorizationCache()
+        segmentation_cache = SegmentationCache()
+
+        # the strokes of the last smart segment and the segmentation stamped over them onto the canvas
+        strokes = {'keep': None, 'dump': None, 'stamp': None}
+
+        def forget_strokes():
+            strokes.update(keep=None, dump=None, stamp=None)
 
         def on_inpaint(checked):
             image = ui.merge.picture_rgb_image()
             foreign = ui.merge.foreign_rgb_image()
             mask = ui.merge.foreign_mask()
 
-            image_ = poisson(image, foreign, mask)
+            image_ = poisson(image, foreign, mask, cache=factorization_cache)
             ui.merge.picture_set_rgb_image(image_)
 
         def on_embed(checked):
@@ -66,10 +74,19 @@ class Control_window:
             keep = ui.scribble.canvas_primary_mask()
             dump = ui.scribble.canvas_secondary_mask()
 
-            output = nn_segmentation_from_masks(image, kernel_size, keep, dump)
+            # the stamp replaced the strokes on the canvas, so the strokes from before it are passed in again
+            # together with the ones drawn since then
+            if strokes['stamp'] is not None and strokes['stamp'].shape == keep.shape:
+                added_keep = keep & ~strokes['stamp']
+                keep = (strokes['keep'] & ~dump) | added_keep
+                dump = (strokes['dump'] & ~added_keep) | dump
+
+            output = nn_segmentation_from_masks(image, kernel_size, keep, dump, cache=segmentation_cache)
+            strokes.update(keep=keep, dump=dump, stamp=output)
             ui.scribble.canvas_fill_primary_mask(output)
 
         def on_open_scribble(checked):
+            forget_strokes()
             fwd_open_file_path(ui.scribble.picture_load_from_path, window)
 
         def on_paint_green(checked):
@@ -82,12 +99,15 @@ class Control_window:
             ui.scribble.canvas_set_pen_erase()
 
         def on_paint_clear(checked):
+            forget_strokes()
             ui.scribble.canvas_clear()
 
         def on_paint_undo(checked):
+            forget_strokes()
             ui.scribble.canvas_undo()
 
         def on_paint_redo(checked):
+            forget_strokes()
             ui.scribble.canvas_redo()
 
         def on_open_merge(checked):
@@ -10,14 +10,19 @@
 
 import sys
 
+import numpy as np
 from PySide2.QtWidgets import QApplication, QMainWindow
 
 from dbvpra.gui.Control_window import Control_window
 from dbvpra.gui.Ui_window import Ui_window
+from dbvpra.precision import set_float_precision
 
 if __name__ == '__main__':
     # app entry point
 
+    # the gui images are 8 bit, float32 is precise enough for them
+    set_float_precision(np.float32)
+
     app = QApplication(sys.argv)
     window = QMainWindow()
 
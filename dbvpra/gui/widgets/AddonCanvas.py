@@ -34,6 +34,8 @@ class AddonCanvas:
     _undo_stack: [QImage]
     _redo_stack: [QImage]
 
+    _dirty: tuple
+
     def __init__(self, width: int, height: int, max_steps: int = 48):
         """
         :param width: the width of the canvas
@@ -56,6 +58,9 @@ class AddonCanvas:
         self._pen_enable = False
         self._pen_pos = QPoint(0, 0)
 
+        self._dirty = None
+        self._canvas_touch_all()
+
     def on_canvas_changed(self, image: QImage):
         """"""
 
@@ -85,6 +90,7 @@ class AddonCanvas:
         self._canvas = Q.rgba_image_generate(width, height)
         self._undo_stack = []
         self._redo_stack = []
+        self._canvas_touch_all()
         self.on_canvas_changed(self._canvas)
 
     def canvas_undo(self):
@@ -94,6 +100,7 @@ class AddonCanvas:
         if len(self._undo_stack) > 0:
             self._redo_stack.append(self._canvas)
             self._canvas = self._undo_stack.pop()
+            self._canvas_touch_all()
             self.on_canvas_changed(self._canvas)
 
     def canvas_redo(self):
@@ -103,6 +110,7 @@ class AddonCanvas:
         if len(self._redo_stack) > 0:
             self._undo_stack.append(self._canvas)
             self._canvas = self._redo_stack.pop()
+            self._canvas_touch_all()
         self.on_canvas_changed(self._canvas)
 
     def canvas_set_pen_primary(self):
@@ -129,8 +137,9 @@ class AddonCanvas:
         :return: the mask of the color passed
         """
 
-        np_color = Q2Np.rgb_color(q_color)
-        np_canvas = Q2Np.rgb_image(self._canvas)
+        # compare the 8 bit values, floats of the same color differ between precisions
+        np_color = Q2Np.rgb_color_uint8(q_color)
+        np_canvas = Q2Np.rgb_image_uint8(self._canvas)
         ny, nx = np_canvas.shape[:2]
 
         np_mask = [[np.all(np_canvas[y, x] == np_color) for x in range(nx)] for y in range(ny)]
@@ -190,6 +199,7 @@ class AddonCanvas:
         clears all content on the canvas
         """
         self._canvas = Q.rgba_image_clear(self._canvas)
+        self._canvas_touch_all()
         self.on_canvas_changed(self._canvas)
 
     def canvas_draw_line(self, start: QPoint, end: QPoint):
@@ -202,4 +212,40 @@ class AddonCanvas:
         painter.setPen(self._pen)
         painter.drawLine(start, end)
         painter.end()
+
+        # the pen reaches half its width around the line, rows are y and columns are x like in the masks
+        margin = (self._pen.width() >> 1) + 1
+        self._canvas_touch((min(start.y(), end.y()) - margin, max(start.y(), end.y()) + margin + 1,
+                            min(start.x(), end.x()) - margin, max(start.x(), end.x()) + margin + 1))
         self.on_canvas_changed(self._canvas)
+
+    def _canvas_touch(self, rectangle: tuple):
+        """
+        :param rectangle: the changed rectangle (x_min, x_max, y_min, y_max) in mask coordinates
+        """
+        x_min, x_max, y_min, y_max = rectangle
+        rectangle = (max(0, x_min), min(self._canvas.height(), x_max),
+                     max(0, y_min), min(self._canvas.width(), y_max))
+
+        # strokes outside of the canvas clip to empty or inverted rectangles
+        if rectangle[0] >= rectangle[1] or rectangle[2] >= rectangle[3]:
+            return
+
+        if self._dirty is not None:
+            rectangle = (min(self._dirty[0], rectangle[0]), max(self._dirty[1], rectangle[1]),
+                         min(self._dirty[2], rectangle[2]), max(self._dirty[3], rectangle[3]))
+        self._dirty = rectangle
+
+    def _canvas_touch_all(self):
+        """
+        Mark the whole canvas as changed
+        """
+        self._canvas_touch((0, self._canvas.height(), 0, self._canvas.width()))
+
+    def canvas_dirty(self):
+        """
+        :return: the rectangle (x_min, x_max, y_min, y_max) in mask coordinates changed since the last call
+                 or None, pass it to the incremental morphology of mathmorph to only update that part of a mask
+        """
+        dirty, self._dirty = self._dirty, None
+        return dirty
@@ -13,6 +13,8 @@ from PySide2.QtCore import Qt
 from PySide2.QtGui import QPainter, QImage, QColor
 from qimage2ndarray import rgb_view, alpha_view, array2qimage
 
+from dbvpra.precision import float_precision
+
 
 class Np:
 
@@ -38,36 +40,48 @@ class Q2Np:
     @staticmethod
     def rgb_image(image: QImage) -> np.ndarray:
         image = rgb_view(image)
-        image = np.array(image, dtype=np.float64)
-        image = image / 255
+        image = np.array(image, dtype=float_precision())
+        image = image / float_precision()(255)
         return image
 
     @staticmethod
     def a_image(image: QImage) -> np.ndarray:
         image = alpha_view(image)
-        image = np.array(image, dtype=np.float64)
-        image = image / 255
+        image = np.array(image, dtype=float_precision())
+        image = image / float_precision()(255)
         return image
 
     @staticmethod
     def rgba_image(image: QImage) -> np.ndarray:
         image = np.dstack((rgb_view(image), alpha_view(image)))
-        image = np.array(image, dtype=np.float64)
-        image = image / 255
+        image = np.array(image, dtype=float_precision())
+        image = image / float_precision()(255)
+        return image
+
+    @staticmethod
+    def rgb_image_uint8(image: QImage) -> np.ndarray:
+        image = rgb_view(image)
+        image = np.array(image, dtype=np.uint8)
         return image
 
+    @staticmethod
+    def rgb_color_uint8(color: QColor) -> np.ndarray:
+        color = [color.red(), color.green(), color.blue()]
+        color = np.array(color, dtype=np.uint8)
+        return color
+
     @staticmethod
     def rgb_color(color: QColor) -> np.ndarray:
         color = [color.red(), color.green(), color.blue()]
-        color = np.array(color, dtype=np.float64)
-        color = color / 255
+        color = np.array(color, dtype=float_precision())
+        color = color / float_precision()(255)
         return color
 
     @staticmethod
     def rgba_color(color: QColor) -> np.ndarray:
         color = [color.red(), color.green(), color.blue(), color.alpha()]
-        color = np.array(color, dtype=np.float64)
-        color = color / 255
+        color = np.array(color, dtype=float_precision())
+        color = color / float_precision()(255)
         return color
 
 
@@ -8,8 +8,22 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+from dbvpra.inpainting.batch import *
+from dbvpra.inpainting.cache import *
 from dbvpra.inpainting.inpainting import *
 from dbvpra.inpainting.poisson import *
+from dbvpra.inpainting.progressive import *
+from dbvpra.inpainting.tiled import *
 from dbvpra.inpainting.util import *
 
-__all__ = ['inpainting', 'poisson']
+__all__ = [
+    'inpainting',
+    'inpainting_batch',
+    'inpainting_progressive',
+    'inpainting_tiled',
+    'poisson',
+    'poisson_batch',
+    'poisson_progressive',
+    'poisson_tiled',
+    'FactorizationCache',
+]
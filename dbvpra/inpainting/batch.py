@@ -0,0 +1,114 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dbvpra.assert_util import assert_rgb_images, assert_mask, assert_image_mask
+from dbvpra.inpainting.solver import _system, _rhs
+from dbvpra.inpainting.util import _mask_components
+from dbvpra.precision.util import _float_dtype, _to_float, _from_float
+
+
+def _batch(images: np.ndarray, foreigns, mask: np.ndarray, out, solver: str, block: int, workers: int):
+    """
+    :param images: the stack of images to solve in
+    :param foreigns: the stack of foreign images or None to inpaint
+    :param mask: the mask of the unknown pixels shared by all images
+    :param out: the stack to write the results into or None to allocate it
+    :param solver: the name of the solver to use
+    :param block: the number of images to solve at once
+    :param workers: the number of threads sharing the columns of a block, None for all cores
+    :return: out
+    """
+
+    n = images.shape[0]
+    dtype = _float_dtype(images)
+    out = np.empty(images.shape, images.dtype) if out is None else out
+    workers = os.cpu_count() if workers is None else workers
+
+    ###
+    # assemble and factorize the system of every component only once
+
+    systems = [(bounds, component_mask) + _system(component_mask, solver, dtype)
+               for bounds, component_mask in _mask_components(mask)]
+
+    with ThreadPoolExecutor(workers) as executor:
+        for start in range(0, n, block):
+            chunk = _to_float(np.asarray(images[start:start + block]), dtype)
+            foreign_chunk = None if foreigns is None else _to_float(np.asarray(foreigns[start:start + block]), dtype)
+            result = np.array(chunk)
+
+            for (y_min, y_max, x_min, x_max), component_mask, d_hat, solve in systems:
+
+                # the color channels of all images of the block as columns of one right hand side
+                b = np.hstack([_rhs(d_hat, chunk[i, y_min:y_max, x_min:x_max],
+                                    None if foreign_chunk is None else foreign_chunk[i, y_min:y_max, x_min:x_max],
+                                    component_mask)
+                               for i in range(len(chunk))])
+
+                columns = np.array_split(np.arange(b.shape[1]), min(workers, b.shape[1]))
+                x = np.hstack(list(executor.map(lambda c: solve(b[:, c]), columns)))
+
+                for i in range(len(chunk)):
+                    # transposed boolean indexing runs in column major order like _vec
+                    result[i, y_min:y_max, x_min:x_max].transpose((1, 0, 2))[component_mask.T] = x[:, 3 * i:3 * i + 3]
+
+            out[start:start + block] = _from_float(np.clip(result, 0, 1), out)
+
+    return out
+
+
+def inpainting_batch(images: np.ndarray, mask: np.ndarray, out: np.ndarray = None, solver: str = 'auto',
+                     block: int = 16, workers: int = None):
+    """
+    :param images: the stack of images to inpaint (N x H x W x 3), may be a numpy.memmap
+    :param mask: the mask where to inpaint every image
+    :param out: the stack to write the results into, may be a numpy.memmap. None to allocate it
+    :param solver: the solver used for the least squares problem ('auto', 'splu', 'multigrid', 'lsqr' or 'dst')
+    :param block: the number of images to solve at once
+    :param workers: the number of threads solving a block, None for all cores
+    :return: the stack of inpainted images
+    """
+
+    assert_rgb_images(images)
+    assert_mask(mask)
+    assert_image_mask(images[0], mask)
+    assert out is None or out.shape == images.shape, "The output needs to have the shape of the Images!"
+    assert block > 0, "The block needs to hold at least one image!"
+
+    return _batch(images, None, mask, out, solver, block, workers)
+
+
+def poisson_batch(images: np.ndarray, foreigns: np.ndarray, mask: np.ndarray, out: np.ndarray = None,
+                  solver: str = 'auto', block: int = 16, workers: int = None):
+    """
+    :param images: the stack of images to embed into (N x H x W x 3), may be a numpy.memmap
+    :param foreigns: the stack of foreign images to embed (N x H x W x 3), may be a numpy.memmap
+    :param mask: the mask where to poisson inpaint every image
+    :param out: the stack to write the results into, may be a numpy.memmap. None to allocate it
+    :param solver: the solver used for the least squares problem ('auto', 'splu', 'multigrid', 'lsqr' or 'dst')
+    :param block: the number of images to solve at once
+    :param workers: the number of threads solving a block, None for all cores
+    :return: the stack of poisson inpainted images
+    """
+
+    assert_rgb_images(images)
+    assert_rgb_images(foreigns)
+    assert_mask(mask)
+    assert_image_mask(images[0], mask)
+    assert images.shape == foreigns.shape, "The Images and Foreigns need to have the same shape!"
+    assert out is None or out.shape == images.shape, "The output needs to have the shape of the Images!"
+    assert block > 0, "The block needs to hold at least one image!"
+
+    return _batch(images, foreigns, mask, out, solver, block, workers)
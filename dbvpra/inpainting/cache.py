@@ -0,0 +1,85 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from dbvpra.assert_util import assert_mask
+from dbvpra.inpainting.solver import _system
+from dbvpra.inpainting.util import _nbytes
+
+
+class FactorizationCache:
+    """
+    LRU cache of assembled and factorized inpainting systems.
+    The systems are keyed by the chopped mask, so moving a mask
+    around the image still hits the cache.
+    """
+
+    def __init__(self, max_bytes: int = 1 << 30):
+        """
+        :param max_bytes: the memory budget of the cache in bytes
+        """
+        assert max_bytes >= 0, "The memory budget needs to be positive!"
+
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """
+        :return: the estimated number of bytes held by the cache
+        """
+        return self._nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._nbytes = 0
+
+    def system(self, chop_mask: np.ndarray, solver: str = 'auto', dtype=np.float64):
+        """
+        :param chop_mask: the mask chopped down to its bounds
+        :param solver: the name of the solver to prepare
+        :param dtype: the float type to compute in
+        :return: tuple of D_hat and the function solving arg minx ||D_hat 1_I x - b||^2
+        """
+
+        assert_mask(chop_mask)
+
+        packed = np.packbits(chop_mask)
+        key = (solver, np.dtype(dtype).str, chop_mask.shape, hashlib.sha1(packed.tobytes()).digest())
+
+        entry = self._entries.get(key)
+        if entry is not None and np.array_equal(entry[0], packed):
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+        d_hat, solve = _system(chop_mask, solver, dtype)
+        nbytes = packed.nbytes + _nbytes(d_hat) + getattr(solve, 'nbytes', 0)
+
+        if entry is not None:
+            self._evict(key)
+
+        if nbytes <= self.max_bytes:
+            self._entries[key] = (packed, d_hat, solve, nbytes)
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+        return d_hat, solve
+
+    def _evict(self, key):
+        self._nbytes -= self._entries.pop(key)[3]
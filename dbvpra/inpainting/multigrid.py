@@ -0,0 +1,150 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+import scipy.sparse as sparse
+import scipy.sparse.linalg
+
+from dbvpra.inpainting.util import _nbytes
+
+
+def _spectral_radius(m, iterations: int = 15):
+    """
+    :param m: a square matrix
+    :param iterations: the number of power iterations
+    :return: an estimate of the spectral radius of m
+    """
+    v = np.random.RandomState(0).rand(m.shape[0])
+    rho = 1.0
+    for _ in range(iterations):
+        w = m @ v
+        rho = np.linalg.norm(w) / np.linalg.norm(v)
+        v = w / np.linalg.norm(w)
+    return rho
+
+
+def _coarsen(l, grid_mask: np.ndarray):
+    """
+    :param l: the system matrix of the unknowns in grid_mask (column major order)
+    :param grid_mask: the mask of the unknowns on the grid
+    :return: tuple of the smoothed prolongation and the restricted mask
+    """
+    ny, nx = grid_mask.shape
+    cy, cx = (ny + 1) >> 1, (nx + 1) >> 1
+
+    # aggregate 2x2 blocks of the grid, a coarse cell is unknown if any of its fine cells is
+    y, x = np.nonzero(grid_mask.T)[::-1]
+    coarse_mask = np.zeros((cy, cx), np.bool_)
+    coarse_mask[y >> 1, x >> 1] = np.True_
+
+    coarse_index = np.full((cy, cx), -1, dtype=np.int64)
+    coarse_index.T[coarse_mask.T] = np.arange(np.count_nonzero(coarse_mask))
+
+    n = len(y)
+    data = np.ones(n, dtype=l.dtype)
+    p = sparse.csr_matrix((data, (np.arange(n), coarse_index[y >> 1, x >> 1])),
+                          shape=(n, np.count_nonzero(coarse_mask)))
+
+    # smooth the piecewise constant prolongation with one jacobi step
+    d_inv_l = sparse.diags(1.0 / l.diagonal()) @ l
+    omega = 4.0 / (3.0 * _spectral_radius(d_inv_l))
+    p = (p - omega * (d_inv_l @ p)).tocsr()
+
+    return p, coarse_mask
+
+
+def _multigrid_levels(l, grid_mask: np.ndarray, coarsest: int = 1024):
+    """
+    :param l: the system matrix of the unknowns in grid_mask (column major order)
+    :param grid_mask: the mask of the unknowns on the grid
+    :param coarsest: the number of unknowns to solve directly
+    :return: list of levels as tuple (l, d_inv, omega, p) and the factorization of the coarsest l
+    """
+    levels = []
+    while l.shape[0] > coarsest and min(grid_mask.shape) > 1:
+        p, grid_mask = _coarsen(l, grid_mask)
+        d_inv = 1.0 / l.diagonal()
+        omega = 4.0 / (3.0 * _spectral_radius(sparse.diags(d_inv) @ l))
+        levels.append((l, d_inv, omega, p))
+        l = (p.T @ l @ p).tocsr()
+
+    return levels, sparse.linalg.splu(l.tocsc())
+
+
+def _v_cycle(levels, lu, b: np.ndarray, level: int = 0, sweeps: int = 2):
+    """
+    :param levels: the multigrid levels
+    :param lu: the factorization of the coarsest level
+    :param b: the right hand sides as columns
+    :param level: the current level
+    :param sweeps: the number of jacobi sweeps before and after the coarse correction
+    :return: the approximated solution of l x = b
+    """
+    if level == len(levels):
+        return lu.solve(np.ascontiguousarray(b))
+
+    l, d_inv, omega, p = levels[level]
+    d_inv = d_inv[:, None]
+
+    # pre smoothing
+    x = omega * d_inv * b
+    for _ in range(sweeps - 1):
+        x += omega * d_inv * (b - l @ x)
+
+    # coarse grid correction
+    x += p @ _v_cycle(levels, lu, p.T @ (b - l @ x), level + 1, sweeps)
+
+    # post smoothing
+    for _ in range(sweeps):
+        x += omega * d_inv * (b - l @ x)
+
+    return x
+
+
+def _multigrid_factorized(a, chop_mask: np.ndarray, tol: float = 1e-8, max_iterations: int = 100):
+    """
+    :param a: matrix a
+    :param chop_mask: the mask chopped down to its bounds, the unknowns of a
+    :param tol: the relative residual to reach
+    :param max_iterations: the maximal number of v-cycles
+    :return: a function solving arg minx ||ax-b||^2 for every column of b using geometric
+             multigrid v-cycles on the normal equations a^T a,
+             the statistics of a call are written into its optional info dict
+    """
+    a_t = a.T.tocsr()
+    l = (a_t @ a).tocsr()
+    levels, lu = _multigrid_levels(l, chop_mask)
+
+    # float32 systems can not reach the tolerance of float64 ones
+    tol = max(tol, 10 * np.finfo(l.dtype).eps)
+
+    def solve(b: np.ndarray, info: dict = None):
+        b = a_t @ b
+        b_norm = np.linalg.norm(b, axis=0)
+        x = np.zeros_like(b)
+        r, r_norm = b, b_norm
+        iterations = 0
+        while iterations < max_iterations:
+            iterations += 1
+            x += _v_cycle(levels, lu, r)
+            r = b - l @ x
+            r_norm, previous = np.linalg.norm(r, axis=0), r_norm
+            # stop at the tolerance or once rounding errors keep the residual from decreasing
+            if np.all((r_norm <= tol * b_norm) | (r_norm >= previous)):
+                break
+
+        residual = r_norm / np.where(b_norm == 0, 1, b_norm)
+        if info is not None:
+            info.update(iterations=iterations, residual=residual.tolist(), converged=bool(np.all(residual <= tol)))
+        return x
+
+    solve.nbytes = _nbytes(a_t, l, lu.L, lu.U, *(m for level in levels for m in (level[0], level[3])))
+    return solve
@@ -0,0 +1,129 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+import scipy.sparse.linalg
+
+from dbvpra.inpainting.multigrid import _multigrid_levels, _v_cycle
+from dbvpra.inpainting.util import _nbytes
+
+
+def _jacobi(l, chop_mask: np.ndarray):
+    """
+    :param l: the symmetric positive definite system matrix
+    :param chop_mask: the mask chopped down to its bounds, the unknowns of l
+    :return: tuple of the jacobi preconditioner and its number of bytes
+    """
+    d_inv = (1.0 / l.diagonal())[:, None]
+    return lambda r: d_inv * r, d_inv.nbytes
+
+
+def _ilu(l, chop_mask: np.ndarray):
+    """
+    :param l: the symmetric positive definite system matrix
+    :param chop_mask: the mask chopped down to its bounds, the unknowns of l
+    :return: tuple of the incomplete factorization preconditioner and its number of bytes
+    """
+    # scipy has no incomplete cholesky, an incomplete lu with a symmetric
+    # ordering and without pivoting stays close to the symmetric l d l^T
+    ilu = scipy.sparse.linalg.spilu(l.tocsc(), drop_tol=1e-4, fill_factor=10, permc_spec='MMD_AT_PLUS_A',
+                                    diag_pivot_thresh=0.0)
+    return lambda r: ilu.solve(np.ascontiguousarray(r)), _nbytes(ilu.L, ilu.U)
+
+
+def _amg(l, chop_mask: np.ndarray):
+    """
+    :param l: the symmetric positive definite system matrix
+    :param chop_mask: the mask chopped down to its bounds, the unknowns of l
+    :return: tuple of the multigrid v-cycle preconditioner and its number of bytes
+    """
+    levels, lu = _multigrid_levels(l, chop_mask)
+    nbytes = _nbytes(lu.L, lu.U, *(m for level in levels for m in (level[0], level[3])))
+    return lambda r: _v_cycle(levels, lu, r), nbytes
+
+
+_PRECONDITIONERS = {
+    'jacobi': _jacobi,
+    'ilu': _ilu,
+    'amg': _amg,
+}
+
+
+def _pcg(l, b: np.ndarray, precondition, tol: float, max_iterations: int):
+    """
+    :param l: the symmetric positive definite system matrix
+    :param b: the right hand sides as columns
+    :param precondition: the function applying the preconditioner to the residuals
+    :param tol: the relative residual to reach
+    :param max_iterations: the maximal number of iterations
+    :return: tuple of the solution of l x = b, the number of iterations and the relative residual of every column
+    """
+    b_norm = np.linalg.norm(b, axis=0)
+    b_norm[b_norm == 0] = 1
+
+    x = np.zeros_like(b)
+    r = np.array(b)
+    z = precondition(r)
+    p = np.array(z)
+    rz = np.sum(r * z, axis=0)
+    residual = np.linalg.norm(r, axis=0) / b_norm
+
+    # every column runs its own conjugate gradient, converged columns stop moving
+    iterations = 0
+    while iterations < max_iterations and np.any(residual > tol):
+        iterations += 1
+        active = residual > tol
+
+        q = l @ p
+        pq = np.sum(p * q, axis=0)
+        alpha = np.divide(rz, pq, out=np.zeros_like(rz), where=active & (pq != 0))
+        x += alpha * p
+        r -= alpha * q
+        residual = np.linalg.norm(r, axis=0) / b_norm
+
+        z = precondition(r)
+        rz, rz_old = np.sum(r * z, axis=0), rz
+        beta = np.divide(rz, rz_old, out=np.zeros_like(rz), where=active & (rz_old != 0))
+        p = z + beta * p
+
+    return x, iterations, residual
+
+
+def _pcg_factorized(a, chop_mask: np.ndarray, preconditioner: str = 'jacobi', tol: float = 1e-8,
+                    max_iterations: int = 1000):
+    """
+    :param a: matrix a
+    :param chop_mask: the mask chopped down to its bounds, the unknowns of a
+    :param preconditioner: the name of the preconditioner ('jacobi', 'ilu' or 'amg')
+    :param tol: the relative residual to reach
+    :param max_iterations: the maximal number of iterations
+    :return: a function solving arg minx ||ax-b||^2 for every column of b using preconditioned
+             conjugate gradients on the normal equations a^T a,
+             the statistics of a call are written into its optional info dict
+    """
+    assert preconditioner in _PRECONDITIONERS, \
+        "The preconditioner needs to be one of %s!" % ', '.join(_PRECONDITIONERS)
+
+    a_t = a.T.tocsr()
+    l = (a_t @ a).tocsr()
+    precondition, nbytes = _PRECONDITIONERS[preconditioner](l, chop_mask)
+
+    # float32 systems can not reach the tolerance of float64 ones
+    tol = max(tol, 10 * np.finfo(l.dtype).eps)
+
+    def solve(b: np.ndarray, info: dict = None):
+        x, iterations, residual = _pcg(l, a_t @ b, precondition, tol, max_iterations)
+        if info is not None:
+            info.update(iterations=iterations, residual=residual.tolist(), converged=bool(np.all(residual <= tol)))
+        return x
+
+    solve.nbytes = nbytes + _nbytes(a_t, l)
+    return solve
@@ -11,15 +11,23 @@
 import numpy as np
 
 from dbvpra.assert_util import assert_rgb_image, assert_mask, assert_image_mask
-from dbvpra.inpainting.util import _o, _d_hat, _lsqr, _vec, _un_vec, _mask_bounds
+from dbvpra.inpainting.cache import FactorizationCache
+from dbvpra.inpainting.solver import _solve_components
+from dbvpra.precision.util import _float_dtype, _to_float, _from_float
 
 
-def poisson(image: np.ndarray, foreign: np.ndarray, mask: np.ndarray):
+def poisson(image: np.ndarray, foreign: np.ndarray, mask: np.ndarray, solver: str = 'auto',
+            cache: FactorizationCache = None, workers: int = None, info: list = None):
     """
     :param image: the image to embed into
     :param foreign: the foreign image to embed
     :param mask: the mask where to poisson inpaint
-    :return: the poisson inpainted image
+    :param solver: the solver used for the least squares problem ('auto', 'splu', 'multigrid', 'lsqr', 'dst',
+                   'pcg_jacobi', 'pcg_ilu' or 'pcg_amg')
+    :param cache: an optional cache to reuse the factorization of equal masks
+    :param workers: the number of processes solving connected components, None for all cores
+    :param info: an optional list to append the solver statistics of every connected component to
+    :return: the poisson inpainted image with the type of image
     """
 
     assert_rgb_image(image)
@@ -28,36 +36,7 @@ def poisson(image: np.ndarray, foreign: np.ndarray, mask: np.ndarray):
     assert_image_mask(image, mask)
     assert_image_mask(foreign, mask)
 
-    ###
-    # chop down the image size to the needed area only
-    # because the needed memory is exponential!
+    dtype = _float_dtype(image)
+    result = _solve_components(_to_float(image, dtype), _to_float(foreign, dtype), mask, solver, cache, workers, info)
 
-    y_min, y_max, x_min, x_max = _mask_bounds(mask)
-    ny, nx = y_max - y_min, x_max - x_min
-
-    vec_chop_image = _vec(image[y_min:y_max, x_min:x_max])
-    vec_chop_foreign = _vec(foreign[y_min:y_max, x_min:x_max])
-    vec_chop_mask = _vec(mask[y_min:y_max, x_min:x_max])
-
-    ###
-    # Begin algorithm
-
-    vec_result = _vec(np.copy(image))
-    vec_mask = _vec(mask)
-
-    # 1_I
-    o = _o(vec_chop_mask)
-
-    # D_hat
-    d_hat = _d_hat(ny, nx)
-
-    # A
-    a = d_hat @ o
-
-    for c in range(3):
-        b = -d_hat @ (~vec_chop_mask * vec_chop_image[:, c])
-        b_add = d_hat @ vec_chop_foreign[:, c]
-        vec_result[vec_mask, c] = _lsqr(a, b + b_add)
-
-    vec_result = np.clip(vec_result, 0, 1)
-    return _un_vec(vec_result, image.shape[0])
+    return _from_float(np.clip(result, 0, 1), image)
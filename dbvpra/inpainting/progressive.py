@@ -0,0 +1,172 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import time
+
+import numpy as np
+
+from dbvpra.assert_util import assert_rgb_image, assert_mask, assert_image_mask
+from dbvpra.inpainting.solver import _solve_components, _rhs
+from dbvpra.inpainting.util import _d_hat_operator, _o_operator, _lsqr_steps, _vec, _mask_components
+from dbvpra.precision.util import _float_dtype, _to_float, _from_float
+
+
+def _downsample(image: np.ndarray, factor: int):
+    """
+    :param image: the image to downsample
+    :param factor: the size of the blocks to average
+    :return: the image averaged over factor x factor blocks
+    """
+    ny, nx = image.shape[:2]
+    cy, cx = -(-ny // factor), -(-nx // factor)
+    pad = ((0, cy * factor - ny), (0, cx * factor - nx)) + ((0, 0),) * (image.ndim - 2)
+    image = np.pad(image, pad, mode='edge')
+    return image.reshape((cy, factor, cx, factor) + image.shape[2:]).mean(axis=(1, 3))
+
+
+def _downsample_mask(mask: np.ndarray, factor: int):
+    """
+    :param mask: the mask to downsample
+    :param factor: the size of the blocks to combine
+    :return: the mask with a block masked if any of its pixels is masked
+    """
+    ny, nx = mask.shape
+    cy, cx = -(-ny // factor), -(-nx // factor)
+    mask = np.pad(mask, ((0, cy * factor - ny), (0, cx * factor - nx)), mode='constant')
+    return mask.reshape((cy, factor, cx, factor)).any(axis=(1, 3))
+
+
+def _upsample(image: np.ndarray, factor: int, ny: int, nx: int):
+    """
+    :param image: the image to upsample
+    :param factor: the size of the blocks to repeat every pixel to
+    :param ny: the height of the result
+    :param nx: the width of the result
+    :return: the image with every pixel repeated to a factor x factor block
+    """
+    return np.repeat(np.repeat(image, factor, axis=0), factor, axis=1)[:ny, :nx]
+
+
+def _progressive(image: np.ndarray, foreign, mask: np.ndarray, coarse: int, tol: float, max_iterations: int,
+                 time_budget: float):
+    """
+    :param image: the image to solve in
+    :param foreign: the foreign image or None to inpaint
+    :param mask: the mask of the unknown pixels
+    :param coarse: the downsampling factor of the preview, 1 to skip the preview
+    :param tol: the relative tolerance of the refinement, scipy's lsqr defaults to 1e-6
+    :param max_iterations: the maximal number of lsqr iterations per component and color channel
+    :param time_budget: the maximal number of seconds to refine
+    :return: generator of the intermediate (clipped) results with the type of image
+    """
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+    like = image
+    dtype = _float_dtype(image)
+    image = _to_float(image, dtype)
+    foreign = None if foreign is None else _to_float(foreign, dtype)
+    result = np.copy(image)
+
+    ###
+    # coarse preview solved directly on a downsampled grid
+
+    if coarse > 1:
+        coarse_mask = _downsample_mask(mask, coarse)
+        coarse_result = _solve_components(_downsample(image, coarse),
+                                          None if foreign is None else _downsample(foreign, coarse),
+                                          coarse_mask, workers=1)
+        result[mask] = _upsample(coarse_result, coarse, *mask.shape)[mask]
+
+        yield _from_float(np.clip(result, 0, 1), like)
+
+        if deadline is not None and time.perf_counter() >= deadline:
+            return
+
+    ###
+    # warm started refinement of every component and color channel on the full grid
+
+    steps = []
+    for bounds, component_mask in _mask_components(mask):
+        y_min, y_max, x_min, x_max = bounds
+        chop_result = result[y_min:y_max, x_min:x_max].transpose((1, 0, 2))
+
+        d_hat = _d_hat_operator(y_max - y_min, x_max - x_min, dtype)
+        a = d_hat.dot(_o_operator(_vec(component_mask), dtype))
+        b = _rhs(d_hat, image[y_min:y_max, x_min:x_max],
+                 None if foreign is None else foreign[y_min:y_max, x_min:x_max],
+                 component_mask)
+
+        # transposed boolean indexing runs in column major order like _vec
+        x0 = chop_result[component_mask.T]
+        for c in range(3):
+            steps.append((chop_result, component_mask.T, c,
+                          _lsqr_steps(a, b[:, c], x0[:, c], tol, max_iterations, deadline=deadline)))
+
+    while steps:
+        pending = []
+        for i, (chop_result, index, c, step) in enumerate(steps):
+            if deadline is not None and time.perf_counter() >= deadline:
+                # no further step is started, the steps of this round so far are the final result
+                if i > 0:
+                    yield _from_float(np.clip(result, 0, 1), like)
+                return
+            for x, converged in step:
+                chop_result[index, c] = x
+                if not converged:
+                    pending.append((chop_result, index, c, step))
+                break
+        steps = pending
+
+        yield _from_float(np.clip(result, 0, 1), like)
+
+
+def inpainting_progressive(image: np.ndarray, mask: np.ndarray, coarse: int = 4, tol: float = 1e-6,
+                           max_iterations: int = None, time_budget: float = None):
+    """
+    :param image: the image to inpaint
+    :param mask: the mask where to inpaint
+    :param coarse: the downsampling factor of the first preview, 1 to skip the preview
+    :param tol: the relative tolerance of the refinement, scipy's lsqr defaults to 1e-6
+    :param max_iterations: the maximal number of lsqr iterations per component and color channel
+    :param time_budget: the maximal number of seconds to refine
+    :return: generator of the inpainted image, refined with every step
+    """
+
+    assert_rgb_image(image)
+    assert_mask(mask)
+    assert_image_mask(image, mask)
+    assert coarse >= 1, "The downsampling factor needs to be at least one!"
+
+    return _progressive(image, None, mask, coarse, tol, max_iterations, time_budget)
+
+
+def poisson_progressive(image: np.ndarray, foreign: np.ndarray, mask: np.ndarray, coarse: int = 4,
+                        tol: float = 1e-6, max_iterations: int = None, time_budget: float = None):
+    """
+    :param image: the image to embed into
+    :param foreign: the foreign image to embed
+    :param mask: the mask where to poisson inpaint
+    :param coarse: the downsampling factor of the first preview, 1 to skip the preview
+    :param tol: the relative tolerance of the refinement, scipy's lsqr defaults to 1e-6
+    :param max_iterations: the maximal number of lsqr iterations per component and color channel
+    :param time_budget: the maximal number of seconds to refine
+    :return: generator of the poisson inpainted image, refined with every step
+    """
+
+    assert_rgb_image(image)
+    assert_rgb_image(foreign)
+    assert_mask(mask)
+    assert_image_mask(image, mask)
+    assert_image_mask(foreign, mask)
+    assert coarse >= 1, "The downsampling factor needs to be at least one!"
+
+    return _progressive(image, foreign, mask, coarse, tol, max_iterations, time_budget)
@@ -0,0 +1,193 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import scipy.sparse as sparse
+import scipy.sparse.linalg
+
+from dbvpra.inpainting.multigrid import _multigrid_factorized
+from dbvpra.inpainting.pcg import _pcg_factorized
+from dbvpra.inpainting.spectral import _dst_factorized, _is_rectangle
+from dbvpra.inpainting.util import _lsqr, _nbytes, _d_hat, _d_hat_operator, _o, _o_operator, _vec, _mask_components
+
+
+def _lsqr_factorized(a, chop_mask: np.ndarray):
+    """
+    :param a: matrix a
+    :param chop_mask: the mask chopped down to its bounds
+    :return: a function solving arg minx ||ax-b||^2 for every column of b with lsqr
+    """
+
+    def solve(b: np.ndarray, info: dict = None):
+        return np.stack([_lsqr(a, b[:, c]) for c in range(b.shape[1])], axis=1)
+
+    return solve
+
+
+def _splu_factorized(a, chop_mask: np.ndarray):
+    """
+    :param a: matrix a
+    :param chop_mask: the mask chopped down to its bounds
+    :return: a function solving arg minx ||ax-b||^2 for every column of b
+             using one lu decomposition of the normal equations a^T a
+    """
+    a_t = a.T.tocsr()
+    lu = sparse.linalg.splu((a_t @ a).tocsc())
+
+    def solve(b: np.ndarray, info: dict = None):
+        return lu.solve(np.ascontiguousarray(a_t @ b))
+
+    solve.nbytes = _nbytes(a_t, lu.L, lu.U)
+    return solve
+
+
+_SOLVERS = {
+    'lsqr': _lsqr_factorized,
+    'splu': _splu_factorized,
+    'multigrid': _multigrid_factorized,
+    'dst': _dst_factorized,
+    'pcg_jacobi': partial(_pcg_factorized, preconditioner='jacobi'),
+    'pcg_ilu': partial(_pcg_factorized, preconditioner='ilu'),
+    'pcg_amg': partial(_pcg_factorized, preconditioner='amg'),
+}
+
+
+# the number of unknowns from which on components are solved in parallel
+_PARALLEL_UNKNOWNS = 1 << 16
+
+# solvers which only need the products with a and a^T
+_MATRIX_FREE = {'lsqr', 'dst'}
+
+
+def _factorized(a, chop_mask: np.ndarray, solver: str = 'splu'):
+    """
+    :param a: matrix a
+    :param chop_mask: the mask chopped down to its bounds, the unknowns of a
+    :param solver: the name of the solver to prepare
+    :return: a function solving arg minx ||ax-b||^2 for every column of b
+    """
+    assert solver in _SOLVERS, "The solver needs to be one of %s!" % ', '.join(_SOLVERS)
+    solve = _SOLVERS[solver](a, chop_mask)
+    solve.solver = solver
+    return solve
+
+
+def _system(chop_mask: np.ndarray, solver: str = 'auto', dtype=np.float64):
+    """
+    :param chop_mask: the mask chopped down to its bounds
+    :param solver: the name of the solver to prepare
+    :param dtype: the float type to compute in
+    :return: tuple of D_hat and the function solving arg minx ||D_hat 1_I x - b||^2
+    """
+    ny, nx = chop_mask.shape
+
+    # rectangles are solved spectrally, everything else with a sparse lu
+    if solver == 'auto':
+        solver = 'dst' if _is_rectangle(chop_mask) else 'splu'
+
+    if solver in _MATRIX_FREE:
+        # D_hat and A = D_hat 1_I without assembling any matrix
+        d_hat = _d_hat_operator(ny, nx, dtype)
+        return d_hat, _factorized(d_hat.dot(_o_operator(_vec(chop_mask), dtype)), chop_mask, solver)
+
+    # D_hat
+    d_hat = _d_hat(ny, nx, dtype)
+
+    # A
+    a = d_hat @ _o(_vec(chop_mask), dtype)
+
+    return d_hat, _factorized(a, chop_mask, solver)
+
+
+def _solve_chop(chop_image: np.ndarray, chop_foreign, chop_mask: np.ndarray, solver: str = 'auto', cache=None):
+    """
+    :param chop_image: the image chopped down to the bounds of chop_mask
+    :param chop_foreign: the foreign image chopped down to the bounds of chop_mask or None to inpaint
+    :param chop_mask: the mask chopped down to its bounds
+    :param solver: the name of the solver to use
+    :param cache: an optional FactorizationCache
+    :return: tuple of the values of the masked pixels (column major order) and the statistics of the solve
+    """
+
+    # D_hat and the factorization of A = D_hat 1_I in the precision of the image,
+    # all three color channels share one factorization
+    dtype = chop_image.dtype.type
+    if cache is None:
+        d_hat, solve = _system(chop_mask, solver, dtype)
+    else:
+        d_hat, solve = cache.system(chop_mask, solver, dtype)
+
+    # the statistics are kept per call, the solve function may be shared through the cache and threads
+    info = {}
+    values = solve(_rhs(d_hat, chop_image, chop_foreign, chop_mask), info)  # x = arg min || Ax + b ||^2
+
+    return values, dict(solver=solve.solver, unknowns=len(values), **info)
+
+
+def _rhs(d_hat, chop_image: np.ndarray, chop_foreign, chop_mask: np.ndarray):
+    """
+    :param d_hat: the D_hat matrix or operator of the chopped grid
+    :param chop_image: the image chopped down to the bounds of chop_mask
+    :param chop_foreign: the foreign image chopped down to the bounds of chop_mask or None to inpaint
+    :param chop_mask: the mask chopped down to its bounds
+    :return: the right hand side b of every color channel as columns
+    """
+    b = -d_hat @ (~_vec(chop_mask)[:, None] * _vec(chop_image))
+    if chop_foreign is not None:
+        b = b + d_hat @ _vec(chop_foreign)
+    return b
+
+
+def _solve_components(image: np.ndarray, foreign, mask: np.ndarray, solver: str = 'auto', cache=None,
+                      workers: int = None, info: list = None):
+    """
+    :param image: the float image to solve in
+    :param foreign: the float foreign image or None to inpaint
+    :param mask: the mask of the unknown pixels
+    :param solver: the name of the solver to use
+    :param cache: an optional FactorizationCache, forces a serial solve
+    :param workers: the number of processes, None for all cores
+    :param info: an optional list to append the statistics of every component solve to
+    :return: a copy of the float image with the solved pixels (not clipped)
+    """
+
+    ###
+    # chop down the image size to every connected component
+    # so distant defects do not span one huge system
+
+    components = _mask_components(mask)
+    chops = [(image[y_min:y_max, x_min:x_max],
+              None if foreign is None else foreign[y_min:y_max, x_min:x_max],
+              component_mask)
+             for (y_min, y_max, x_min, x_max), component_mask in components]
+
+    workers = os.cpu_count() if workers is None else workers
+    parallel = (cache is None and workers > 1 and len(chops) > 1
+                and np.count_nonzero(mask) >= _PARALLEL_UNKNOWNS)
+
+    if parallel:
+        with ProcessPoolExecutor(min(workers, len(chops))) as executor:
+            solved = list(executor.map(_solve_chop, *zip(*chops), [solver] * len(chops)))
+    else:
+        solved = [_solve_chop(*chop, solver, cache) for chop in chops]
+
+    if info is not None:
+        info.extend(statistics for _, statistics in solved)
+
+    result = np.copy(image)
+    for ((y_min, y_max, x_min, x_max), component_mask), (value, _) in zip(components, solved):
+        # transposed boolean indexing runs in column major order like _vec
+        result[y_min:y_max, x_min:x_max].transpose((1, 0, 2))[component_mask.T] = value
+
+    return result
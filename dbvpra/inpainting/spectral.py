@@ -0,0 +1,50 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+import scipy.fft
+
+
+def _is_rectangle(chop_mask: np.ndarray):
+    """
+    :param chop_mask: the mask chopped down to its bounds
+    :return: whether the mask is a rectangle with known pixels all around it
+    """
+    ny, nx = chop_mask.shape
+    if ny < 3 or nx < 3 or not chop_mask[1:-1, 1:-1].all():
+        return False
+    return not (chop_mask[[0, -1], :].any() or chop_mask[:, [0, -1]].any())
+
+
+def _dst_factorized(a, chop_mask: np.ndarray):
+    """
+    :param a: matrix a
+    :param chop_mask: the mask chopped down to its bounds, the unknowns of a
+    :return: a function solving arg minx ||ax-b||^2 for every column of b
+             by diagonalizing the normal equations a^T a with a discrete sine transform
+    """
+    assert _is_rectangle(chop_mask), "The dst solver needs a rectangular mask with known pixels around it!"
+
+    # a^T a is the dirichlet laplacian of the rectangle,
+    # the dst-I diagonalizes its second differences along every axis
+    ny, nx = chop_mask.shape[0] - 2, chop_mask.shape[1] - 2
+    eig_y = 2.0 - 2.0 * np.cos(np.pi * np.arange(1, ny + 1) / (ny + 1))
+    eig_x = 2.0 - 2.0 * np.cos(np.pi * np.arange(1, nx + 1) / (nx + 1))
+    eig = (eig_y[:, None] + eig_x[None, :]).astype(a.dtype)
+
+    def solve(b: np.ndarray, info: dict = None):
+        grid = (a.T @ b).reshape((ny, nx, -1), order='F')
+        grid = scipy.fft.dstn(grid, type=1, axes=(0, 1), norm='ortho')
+        grid = scipy.fft.dstn(grid / eig[:, :, None], type=1, axes=(0, 1), norm='ortho')
+        return grid.reshape((ny * nx, -1), order='F')
+
+    solve.nbytes = eig.nbytes
+    return solve
@@ -0,0 +1,203 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+
+from dbvpra.assert_util import assert_rgb_image, assert_mask, assert_image_mask
+from dbvpra.inpainting.progressive import _downsample, _downsample_mask
+from dbvpra.inpainting.solver import _solve_components
+from dbvpra.precision.util import _float_dtype, _to_float, _from_float
+
+
+def _region(y_min: int, y_max: int, x_min: int, x_max: int, halo: int, ny: int, nx: int):
+    """
+    :return: the bounds grown by halo and clipped to the image. (y_min, y_max, x_min, x_max)
+    """
+    return max(0, y_min - halo), min(ny, y_max + halo), max(0, x_min - halo), min(nx, x_max + halo)
+
+
+def _solve_region(source: np.ndarray, foreign, mask: np.ndarray, out: np.ndarray, region, core, solver: str,
+                  fixed_border: bool, dtype):
+    """
+    :param source: the image to read the region from
+    :param foreign: the foreign image or None to inpaint
+    :param mask: the mask of the unknown pixels
+    :param out: the image to write the core into
+    :param region: the bounds to solve in. (y_min, y_max, x_min, x_max)
+    :param core: the bounds to write back. (y_min, y_max, x_min, x_max)
+    :param solver: the name of the solver to use
+    :param fixed_border: whether masked pixels on the halo edges of the region are taken as known from source
+    :param dtype: the float type to compute in
+    """
+    y_min, y_max, x_min, x_max = region
+    cy_min, cy_max, cx_min, cx_max = core
+
+    region_mask = np.array(mask[y_min:y_max, x_min:x_max])
+    if fixed_border:
+        # only the sides inside the image are halo edges, masked pixels on the image border stay unknown
+        ny, nx = mask.shape
+        if y_min > 0:
+            region_mask[0, :] = np.False_
+        if y_max < ny:
+            region_mask[-1, :] = np.False_
+        if x_min > 0:
+            region_mask[:, 0] = np.False_
+        if x_max < nx:
+            region_mask[:, -1] = np.False_
+
+    region_image = _to_float(np.asarray(source[y_min:y_max, x_min:x_max]), dtype)
+    if region_mask.any():
+        region_foreign = None if foreign is None else _to_float(np.asarray(foreign[y_min:y_max, x_min:x_max]), dtype)
+        region_image = _solve_components(region_image, region_foreign, region_mask, solver, workers=1)
+
+    region_image = np.clip(region_image[cy_min - y_min:cy_max - y_min, cx_min - x_min:cx_max - x_min], 0, 1)
+    out[cy_min:cy_max, cx_min:cx_max] = _from_float(region_image, out)
+
+
+def _coarse(image: np.ndarray, foreign, mask: np.ndarray, factor: int, block: int, solver: str, dtype):
+    """
+    :param image: the image to solve in
+    :param foreign: the foreign image or None to inpaint
+    :param mask: the mask of the unknown pixels
+    :param factor: the downsampling factor
+    :param block: the edge length of the blocks to downsample at once, a multiple of factor
+    :param solver: the name of the solver to use
+    :param dtype: the float type to compute in
+    :return: the solution on the downsampled grid
+    """
+    ny, nx = mask.shape
+    cy, cx = -(-ny // factor), -(-nx // factor)
+
+    coarse_image = np.empty((cy, cx, 3), dtype)
+    coarse_foreign = None if foreign is None else np.empty((cy, cx, 3), dtype)
+    coarse_mask = np.empty((cy, cx), np.bool_)
+
+    for y in range(0, ny, block):
+        for x in range(0, nx, block):
+            c = (slice(y // factor, -(-min(ny, y + block) // factor)),
+                 slice(x // factor, -(-min(nx, x + block) // factor)))
+            f = (slice(y, y + block), slice(x, x + block))
+            coarse_image[c] = _downsample(_to_float(np.asarray(image[f]), dtype), factor)
+            coarse_mask[c] = _downsample_mask(np.asarray(mask[f]), factor)
+            if foreign is not None:
+                coarse_foreign[c] = _downsample(_to_float(np.asarray(foreign[f]), dtype), factor)
+
+    if not coarse_mask.any():
+        return coarse_image
+    return _solve_components(coarse_image, coarse_foreign, coarse_mask, solver, workers=1)
+
+
+def _tiled(image: np.ndarray, foreign, mask: np.ndarray, out, tile: int, halo: int, solver: str):
+    """
+    :param image: the image to solve in
+    :param foreign: the foreign image or None to inpaint
+    :param mask: the mask of the unknown pixels
+    :param out: the image to write the result into or None to allocate it in memory
+    :param tile: the edge length of the tiles
+    :param halo: the overlap of the tiles
+    :param solver: the name of the solver to use
+    :return: out
+    """
+
+    ny, nx = mask.shape
+    dtype = _float_dtype(image)
+    out = np.empty(image.shape, image.dtype) if out is None else out
+    tiles = [(y, min(ny, y + tile), x, min(nx, x + tile)) for y in range(0, ny, tile) for x in range(0, nx, tile)]
+
+    ###
+    # solve the whole image on a grid downsampled to about one tile
+    # and take it as initial guess for the masked pixels
+
+    factor = -(-max(ny, nx) // tile)
+    coarse = _coarse(image, foreign, mask, factor, max(factor, tile - tile % factor), solver, dtype)
+
+    for y_min, y_max, x_min, x_max in tiles:
+        tile_mask = np.asarray(mask[y_min:y_max, x_min:x_max])
+        tile_image = np.array(_to_float(np.asarray(image[y_min:y_max, x_min:x_max]), dtype))
+        guess = coarse[y_min // factor:-(-y_max // factor), x_min // factor:-(-x_max // factor)]
+        guess = np.repeat(np.repeat(guess, factor, axis=0), factor, axis=1)
+        guess = guess[y_min % factor:, x_min % factor:][:y_max - y_min, :x_max - x_min]
+        tile_image[tile_mask] = guess[tile_mask]
+        out[y_min:y_max, x_min:x_max] = _from_float(tile_image, out)
+
+    ###
+    # solve every tile grown by the halo and write back its core,
+    # masked pixels on the border of the grown tile are known from the guess
+
+    for core in tiles:
+        region = _region(*core, halo, ny, nx)
+        _solve_region(out, foreign, mask, out, region, core, solver, True, dtype)
+
+    ###
+    # make the seams consistent by solving a strip around every seam
+    # with the tile results on the strip border as known pixels
+
+    seam = halo >> 1
+    for x_seam in range(tile, nx, tile):
+        for y in range(0, ny, tile):
+            core = (y, min(ny, y + tile), x_seam - seam, min(nx, x_seam + seam))
+            region = _region(y, min(ny, y + tile), x_seam, x_seam, halo, ny, nx)
+            _solve_region(out, foreign, mask, out, region, core, solver, True, dtype)
+
+    for y_seam in range(tile, ny, tile):
+        for x in range(0, nx, tile):
+            core = (y_seam - seam, min(ny, y_seam + seam), x, min(nx, x + tile))
+            region = _region(y_seam, y_seam, x, min(nx, x + tile), halo, ny, nx)
+            _solve_region(out, foreign, mask, out, region, core, solver, True, dtype)
+
+    return out
+
+
+def inpainting_tiled(image: np.ndarray, mask: np.ndarray, out: np.ndarray = None, tile: int = 1024,
+                     halo: int = 64, solver: str = 'auto'):
+    """
+    :param image: the image to inpaint, may be a numpy.memmap
+    :param mask: the mask where to inpaint, may be a numpy.memmap
+    :param out: the image to write the result into, may be a numpy.memmap. None allocates the whole image
+                in memory, pass a numpy.memmap to keep the peak memory proportional to the tile
+    :param tile: the edge length of the tiles
+    :param halo: the overlap of the tiles
+    :param solver: the solver used for the least squares problem ('auto', 'splu', 'multigrid', 'lsqr' or 'dst')
+    :return: the inpainted image
+    """
+
+    assert_rgb_image(image)
+    assert_mask(mask)
+    assert_image_mask(image, mask)
+    assert out is None or out.shape == image.shape, "The output needs to have the shape of the Image!"
+    assert 2 <= halo <= tile, "The halo needs to be between two and the tile size!"
+
+    return _tiled(image, None, mask, out, tile, halo, solver)
+
+
+def poisson_tiled(image: np.ndarray, foreign: np.ndarray, mask: np.ndarray, out: np.ndarray = None,
+                  tile: int = 1024, halo: int = 64, solver: str = 'auto'):
+    """
+    :param image: the image to embed into, may be a numpy.memmap
+    :param foreign: the foreign image to embed, may be a numpy.memmap
+    :param mask: the mask where to poisson inpaint, may be a numpy.memmap
+    :param out: the image to write the result into, may be a numpy.memmap. None allocates the whole image
+                in memory, pass a numpy.memmap to keep the peak memory proportional to the tile
+    :param tile: the edge length of the tiles
+    :param halo: the overlap of the tiles
+    :param solver: the solver used for the least squares problem ('auto', 'splu', 'multigrid', 'lsqr' or 'dst')
+    :return: the poisson inpainted image
+    """
+
+    assert_rgb_image(image)
+    assert_rgb_image(foreign)
+    assert_mask(mask)
+    assert_image_mask(image, mask)
+    assert_image_mask(foreign, mask)
+    assert out is None or out.shape == image.shape, "The output needs to have the shape of the Image!"
+    assert 2 <= halo <= tile, "The halo needs to be between two and the tile size!"
+
+    return _tiled(image, foreign, mask, out, tile, halo, solver)
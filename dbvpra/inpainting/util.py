@@ -8,9 +8,12 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+import time
+
 import numpy as np
 import scipy.sparse as sparse
 import scipy.sparse.linalg
+from scipy import ndimage
 
 
 def _vec(matrix: np.ndarray):
@@ -40,32 +43,100 @@ def _kron(a: np.ndarray, b: np.ndarray):
     return sparse.kron(a, b)
 
 
-def _lsqr(a: np.ndarray, b: np.ndarray):
+def _lsqr(a: np.ndarray, b: np.ndarray, x0: np.ndarray = None, tol: float = 1e-6, iter_lim: int = None,
+          time_budget: float = None):
     """
     :param a: matrix a
     :param b: matrix b
+    :param x0: the initial guess to warm start from
+    :param tol: the relative tolerance of the residual, scipy defaults to 1e-6
+    :param iter_lim: the maximal number of iterations
+    :param time_budget: the maximal number of seconds to iterate
     :return: the result = arg minx ||ax-b||^2
     """
-    return sparse.linalg.lsqr(a, b)[0]
+    if time_budget is None:
+        return sparse.linalg.lsqr(a, b, atol=tol, btol=tol, iter_lim=iter_lim, x0=x0)[0]
+
+    deadline = time.perf_counter() + time_budget
+    x = x0
+    for x, _ in _lsqr_steps(a, b, x0, tol, iter_lim, deadline=deadline):
+        if time.perf_counter() >= deadline:
+            break
+    return x
+
+
+def _lsqr_steps(a: np.ndarray, b: np.ndarray, x0: np.ndarray = None, tol: float = 1e-6, iter_lim: int = None,
+                step: int = 16, deadline: float = None):
+    """
+    :param a: matrix a
+    :param b: matrix b
+    :param x0: the initial guess to warm start from
+    :param tol: the relative tolerance of the residual, scipy defaults to 1e-6
+    :param iter_lim: the maximal number of iterations
+    :param step: the number of iterations of the first step, doubled every step
+    :param deadline: the time.perf_counter() value to finish by, steps shrink to the iterations that fit before it
+    :return: generator of the warm started intermediate results as tuple (x, converged)
+    """
+    iter_lim = 2 * min(a.shape) if iter_lim is None else iter_lim
+    x = x0
+    seconds = None
+    while iter_lim > 0:
+        size = min(step, iter_lim)
+        if deadline is not None:
+            # a first single iteration measures the seconds per iteration,
+            # later steps take at most the iterations that fit before the deadline
+            remaining = deadline - time.perf_counter()
+            size = 1 if seconds is None else max(1, min(size, int(remaining / seconds)))
+        start = time.perf_counter()
+        x, istop, itn = sparse.linalg.lsqr(a, b, atol=tol, btol=tol, iter_lim=size, x0=x)[:3]
+        if seconds is None and deadline is not None:
+            seconds = (time.perf_counter() - start) / max(1, itn)
+        else:
+            step <<= 1
+        iter_lim -= itn
+        # istop 7 means the iteration limit was hit before convergence
+        converged = istop != 7
+        yield x, converged
+        if converged:
+            return
+
+
+def _nbytes(*matrices):
+    """
+    :param matrices: sparse or dense matrices or matrix free operators
+    :return: the number of bytes held by the matrices, operators hold none
+    """
+    n = 0
+    for m in matrices:
+        if isinstance(m, sparse.linalg.LinearOperator):
+            continue
+        if sparse.issparse(m):
+            m = m.tocsr() if m.format not in ('csr', 'csc') else m
+            n += m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+        else:
+            n += m.nbytes
+    return n
 
 
-def _id(length: int):
+def _id(length: int, dtype=np.float64):
     """
     :param length: the length of the diagonal to generate
+    :param dtype: the float type of the matrix
     :return: an identity matrix with the size of length x length
     """
-    return sparse.identity(length, dtype=np.float64)
+    return sparse.identity(length, dtype=dtype)
     # return np.diag(np.ones(length, dtype=np.float64))
 
 
-def _d(length: int):
+def _d(length: int, dtype=np.float64):
     """
     :param length: the length of the diagonal to generate
+    :param dtype: the float type of the matrix
     :return: a 'D' matrix with the size of length+1 x length
     """
 
     s = length
-    e = np.ones(s, dtype=np.float64)
+    e = np.ones(s, dtype=dtype)
 
     return sparse.spdiags([e, -e], [0, 1], s - 1, s)
 
@@ -76,29 +147,86 @@ def _d(length: int):
     # return a - b
 
 
-def _d_hat(ny: int, nx: int):
+def _d_hat(ny: int, nx: int, dtype=np.float64):
     """
     :param ny: the height of the image
     :param nx: the width of the image
+    :param dtype: the float type of the matrix
     :return: a 'D_hat' matrix
     """
-    dy = sparse.kron(_id(nx), _d(ny))
-    dx = sparse.kron(_d(nx), _id(ny))
-    return sparse.vstack([dy, dx])
+    dy = sparse.kron(_id(nx, dtype), _d(ny, dtype))
+    dx = sparse.kron(_d(nx, dtype), _id(ny, dtype))
+    return sparse.vstack([dy, dx], format='csr')
+
+
+def _d_hat_operator(ny: int, nx: int, dtype=np.float64):
+    """
+    :param ny: the height of the image
+    :param nx: the width of the image
+    :param dtype: the float type of the operator
+    :return: a matrix free 'D_hat' operator applying the finite differences on the image grid
+    """
+    my, mx = (ny - 1) * nx, ny * (nx - 1)
 
+    def matmat(v: np.ndarray):
+        grid = v.reshape((ny, nx, -1), order='F')
+        dy = grid[:-1] - grid[1:]
+        dx = grid[:, :-1] - grid[:, 1:]
+        return np.concatenate([dy.reshape((my, -1), order='F'),
+                               dx.reshape((mx, -1), order='F')])
 
-def _o(vec_mask: np.ndarray):
+    def rmatmat(u: np.ndarray):
+        u = u.reshape((my + mx, -1))
+        dy = u[:my].reshape((ny - 1, nx, -1), order='F')
+        dx = u[my:].reshape((ny, nx - 1, -1), order='F')
+        grid = np.zeros((ny, nx, u.shape[1]), dtype=np.result_type(u, dtype))
+        grid[:-1] += dy
+        grid[1:] -= dy
+        grid[:, :-1] += dx
+        grid[:, 1:] -= dx
+        return grid.reshape((ny * nx, -1), order='F')
+
+    return sparse.linalg.LinearOperator((my + mx, ny * nx), dtype=dtype,
+                                        matvec=lambda v: matmat(v)[:, 0], rmatvec=lambda u: rmatmat(u)[:, 0],
+                                        matmat=matmat, rmatmat=rmatmat)
+
+
+def _o(vec_mask: np.ndarray, dtype=np.float64):
     """
     :param vec_mask: the mask to generate 1_I from (vectorised)
-    :return: 1_I
+    :param dtype: the float type of the matrix
+    :return: 1_I as sparse matrix
     """
-    return np.diag(vec_mask)[:, vec_mask]
-    # n = len(vec_mask)
-    # nr = np.sum(vec_mask)
-    # data = np.ones(nr, dtype=np.float64)
-    # j = range(nr)
-    # i = np.where(vec_mask)[0]
-    # return sparse.coo_matrix((data, (i, j)), shape=(n, nr))
+    n = len(vec_mask)
+    i = np.flatnonzero(vec_mask)
+    nr = len(i)
+    data = np.ones(nr, dtype=dtype)
+    j = np.arange(nr)
+    return sparse.csc_matrix((data, (i, j)), shape=(n, nr))
+    # return np.diag(vec_mask)[:, vec_mask]
+
+
+def _o_operator(vec_mask: np.ndarray, dtype=np.float64):
+    """
+    :param vec_mask: the mask to generate 1_I from (vectorised)
+    :param dtype: the float type of the operator
+    :return: a matrix free 1_I operator scattering into and gathering from the mask
+    """
+    n = len(vec_mask)
+    i = np.flatnonzero(vec_mask)
+
+    def matmat(v: np.ndarray):
+        v = v.reshape((len(i), -1))
+        result = np.zeros((n, v.shape[1]), dtype=np.result_type(v, dtype))
+        result[i] = v
+        return result
+
+    def rmatmat(u: np.ndarray):
+        return u.reshape((n, -1))[i]
+
+    return sparse.linalg.LinearOperator((n, len(i)), dtype=dtype,
+                                        matvec=lambda v: matmat(v)[:, 0], rmatvec=lambda u: rmatmat(u)[:, 0],
+                                        matmat=matmat, rmatmat=rmatmat)
 
 
 def _mask_bounds(mask: np.ndarray):
@@ -114,3 +242,24 @@ def _mask_bounds(mask: np.ndarray):
             min(ny, np.max(v[0]) + 2),
             max(n0, np.min(v[1]) - 1),
             min(nx, np.max(v[1]) + 2))
+
+
+def _mask_components(mask: np.ndarray):
+    """
+    :param mask: the mask to generate the component bounds from
+    :return: list of tuples of the bounds and the mask of every 4-connected component.
+             ((y_min, y_max, x_min, x_max), component_mask)
+    """
+    ny, nx = mask.shape
+    labels, _ = ndimage.label(mask)
+
+    components = []
+    for label, (sy, sx) in enumerate(ndimage.find_objects(labels), 1):
+        bounds = (max(0, sy.start - 1),
+                  min(ny, sy.stop + 1),
+                  max(0, sx.start - 1),
+                  min(nx, sx.stop + 1))
+        y_min, y_max, x_min, x_max = bounds
+        components.append((bounds, labels[y_min:y_max, x_min:x_max] == label))
+
+    return components
@@ -11,15 +11,40 @@
 from dbvpra.mathmorph.closing import *
 from dbvpra.mathmorph.dilation import *
 from dbvpra.mathmorph.erosion import *
+from dbvpra.mathmorph.grayscale import *
+from dbvpra.mathmorph.incremental import *
 from dbvpra.mathmorph.kernel import *
 from dbvpra.mathmorph.opening import *
+from dbvpra.mathmorph.packed import *
+from dbvpra.mathmorph.pipeline import *
+from dbvpra.mathmorph.reconstruct import *
 
 __all__ = [
     'cross',
     'stripe',
     'point',
+    'decompose',
     'closing',
     'opening',
     'erosion',
     'dilation',
+    'closing_gray',
+    'opening_gray',
+    'erosion_gray',
+    'dilation_gray',
+    'dirty_rectangle',
+    'closing_update',
+    'opening_update',
+    'erosion_update',
+    'dilation_update',
+    'PackedMask',
+    'pack',
+    'unpack',
+    'closing_packed',
+    'opening_packed',
+    'erosion_packed',
+    'dilation_packed',
+    'Morphology',
+    'reconstruct',
+    'fill_holes',
 ]
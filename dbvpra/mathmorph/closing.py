@@ -11,12 +11,15 @@
 import numpy as np
 
 from dbvpra.assert_util import assert_mask, assert_kernel
+from dbvpra.mathmorph.util import _hit
 
 
-def closing(mask: np.ndarray, kernel: np.ndarray):
+def closing(mask: np.ndarray, kernel: np.ndarray, rectangles: list = None, workers: int = 1):
     """
     :param mask: the source image to close
     :param kernel: the kernel used to close the source
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large masks, None for all cores, serial by default
     :return: the closed source
     """
 
@@ -30,11 +33,8 @@ def closing(mask: np.ndarray, kernel: np.ndarray):
     """2. Pad the source for a more easy iteration"""
     mask = np.pad(mask, kernel_size >> 1, mode='edge')
 
-    """3. The algorithm"""
-    destination = np.empty((width, height), np.bool_)
-    for x in range(0, width):
-        for y in range(0, height):
-            pat = mask[x:x + kernel_size, y:y + kernel_size]
-            destination[x, y] = np.any(np.multiply(pat, kernel))
+    """3. The algorithm, running passes per kernel rectangle or one shifted view per true kernel pixel,
+       large masks are split into strips run on a thread pool"""
+    destination = _hit(mask, kernel, width, height, rectangles, workers=workers)
 
     return destination
@@ -14,11 +14,13 @@ from dbvpra.mathmorph.closing import closing
 from dbvpra.mathmorph.opening import opening
 
 
-def dilation(source: np.ndarray, kernel: np.ndarray):
+def dilation(source: np.ndarray, kernel: np.ndarray, rectangles: list = None, workers: int = 1):
     """
     :param source: the source image to dilate
     :param kernel: the kernel used to dilate the source
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large masks, None for all cores, serial by default
     :return: the dilated source
     """
 
-    return opening(closing(source, kernel), kernel)
+    return opening(closing(source, kernel, rectangles, workers), kernel, rectangles, workers)
@@ -14,11 +14,13 @@ from dbvpra.mathmorph.closing import closing
 from dbvpra.mathmorph.opening import opening
 
 
-def erosion(source: np.ndarray, kernel: np.ndarray):
+def erosion(source: np.ndarray, kernel: np.ndarray, rectangles: list = None, workers: int = 1):
     """
     :param source: the source image to erode
     :param kernel: the kernel used to erode the source
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large masks, None for all cores, serial by default
     :return: the eroded source
     """
 
-    return closing(opening(source, kernel), kernel)
+    return closing(opening(source, kernel, rectangles, workers), kernel, rectangles, workers)
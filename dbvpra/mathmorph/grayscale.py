@@ -0,0 +1,84 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+
+from dbvpra.assert_util import assert_image, assert_kernel
+from dbvpra.mathmorph.util import _fit, _hit
+
+
+def _gray(image: np.ndarray, kernel: np.ndarray, rectangles: list, workers: int, operation):
+    """
+    :param image: the single or multi channel image
+    :param kernel: the kernel
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large images, None for all cores, serial by default
+    :param operation: _fit for the minimum or _hit for the maximum over the kernel
+    :return: the minimum or maximum over the kernel of every channel
+    """
+
+    assert_image(image)
+    assert_kernel(kernel)
+
+    """1. Invent some aliases for the algorithm"""
+    kernel_size = kernel.shape[0]
+    (width, height) = image.shape[:2]
+
+    """2. Pad the source for a more easy iteration, the channels stay untouched"""
+    radius = kernel_size >> 1
+    image = np.pad(image, ((radius, radius), (radius, radius)) + ((0, 0),) * (image.ndim - 2), mode='edge')
+
+    """3. The algorithm, running min/max passes per kernel rectangle or one shifted view per true kernel pixel"""
+    return operation(image, kernel, width, height, rectangles, workers=workers)
+
+
+def opening_gray(image: np.ndarray, kernel: np.ndarray, rectangles: list = None, workers: int = 1):
+    """
+    :param image: the single or multi channel image to open, float64, float32 or uint8
+    :param kernel: the kernel used to open the image
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large images, None for all cores, serial by default
+    :return: the opened image, the minimum over the kernel like opening on a 0/1 image
+    """
+    return _gray(image, kernel, rectangles, workers, _fit)
+
+
+def closing_gray(image: np.ndarray, kernel: np.ndarray, rectangles: list = None, workers: int = 1):
+    """
+    :param image: the single or multi channel image to close, float64, float32 or uint8
+    :param kernel: the kernel used to close the image
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large images, None for all cores, serial by default
+    :return: the closed image, the maximum over the kernel like closing on a 0/1 image
+    """
+    return _gray(image, kernel, rectangles, workers, _hit)
+
+
+def dilation_gray(image: np.ndarray, kernel: np.ndarray, rectangles: list = None, workers: int = 1):
+    """
+    :param image: the single or multi channel image to dilate, float64, float32 or uint8
+    :param kernel: the kernel used to dilate the image
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large images, None for all cores, serial by default
+    :return: the dilated image
+    """
+    return opening_gray(closing_gray(image, kernel, rectangles, workers), kernel, rectangles, workers)
+
+
+def erosion_gray(image: np.ndarray, kernel: np.ndarray, rectangles: list = None, workers: int = 1):
+    """
+    :param image: the single or multi channel image to erode, float64, float32 or uint8
+    :param kernel: the kernel used to erode the image
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param workers: the number of threads sharing the strips of large images, None for all cores, serial by default
+    :return: the eroded image
+    """
+    return closing_gray(opening_gray(image, kernel, rectangles, workers), kernel, rectangles, workers)
@@ -0,0 +1,141 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+
+from dbvpra.assert_util import assert_mask, assert_kernel
+from dbvpra.mathmorph.util import _decomposed, _fit, _hit
+
+
+def _grow(rectangle: tuple, radius: int, shape: tuple):
+    """
+    :param rectangle: the rectangle (x_min, x_max, y_min, y_max)
+    :param radius: the number of pixels to grow the rectangle by on every side
+    :param shape: the shape of the mask to clip the rectangle to
+    :return: the grown and clipped rectangle
+    """
+    x_min, x_max, y_min, y_max = rectangle
+    return (max(0, x_min - radius), min(shape[0], x_max + radius),
+            max(0, y_min - radius), min(shape[1], y_max + radius))
+
+
+def _update(mask: np.ndarray, output: np.ndarray, kernel: np.ndarray, dirty: tuple, rectangles: list, operations):
+    """
+    :param mask: the changed source
+    :param output: the result of the operations on the previous source, updated in place
+    :param kernel: the kernel of every operation
+    :param dirty: the rectangle (x_min, x_max, y_min, y_max) containing every changed pixel of the source,
+                  None or an empty rectangle if nothing changed
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :param operations: _fit or _hit for every stage
+    :return: the rectangle of the output which was recomputed or None if nothing changed
+    """
+
+    assert_mask(mask)
+    assert_mask(output)
+    assert_kernel(kernel)
+    assert mask.shape == output.shape, "The Mask and Output need to have the same shape!"
+
+    # no rectangle or an empty or inverted one after clipping to the mask means nothing changed
+    if dirty is None:
+        return None
+    dirty = _grow(dirty, 0, mask.shape)
+    if dirty[0] >= dirty[1] or dirty[2] >= dirty[3]:
+        return None
+
+    """1. Invent some aliases for the algorithm"""
+    radius = kernel.shape[0] >> 1
+    (width, height) = mask.shape
+    rectangles = _decomposed(kernel) if rectangles is None else rectangles
+    n = len(operations)
+
+    """2. The algorithm, every stage recomputes the part of its result the following stages read"""
+    current, origin = mask, (0, 0)
+    for stage, operation in enumerate(operations, 1):
+        x_min, x_max, y_min, y_max = _grow(dirty, (2 * n - stage) * radius, mask.shape)
+
+        # clipped indices pad the window like numpy.pad(mode='edge') pads the whole mask
+        rows = np.clip(np.arange(x_min - radius, x_max + radius), 0, width - 1) - origin[0]
+        columns = np.clip(np.arange(y_min - radius, y_max + radius), 0, height - 1) - origin[1]
+        padded = current[rows[:, None], columns]
+
+        current = operation(padded, kernel, x_max - x_min, y_max - y_min, rectangles, workers=1)
+        origin = (x_min, y_min)
+
+    output[x_min:x_max, y_min:y_max] = current
+    return x_min, x_max, y_min, y_max
+
+
+def dirty_rectangle(previous: np.ndarray, mask: np.ndarray):
+    """
+    :param previous: the previous source
+    :param mask: the changed source
+    :return: the rectangle (x_min, x_max, y_min, y_max) containing every changed pixel or None if nothing changed
+    """
+    assert_mask(previous)
+    assert_mask(mask)
+    assert previous.shape == mask.shape, "The Previous and Mask need to have the same shape!"
+
+    changed = previous != mask
+    rows, columns = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+    if len(rows) == 0:
+        return None
+    return int(rows[0]), int(rows[-1]) + 1, int(columns[0]), int(columns[-1]) + 1
+
+
+def opening_update(mask: np.ndarray, output: np.ndarray, kernel: np.ndarray, dirty: tuple, rectangles: list = None):
+    """
+    :param mask: the changed source image
+    :param output: the opened previous source, updated in place to opening(mask, kernel)
+    :param kernel: the kernel used to open the source
+    :param dirty: the rectangle (x_min, x_max, y_min, y_max) containing every changed pixel, see dirty_rectangle
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :return: the rectangle of the output which was recomputed or None if nothing changed
+    """
+    return _update(mask, output, kernel, dirty, rectangles, (_fit,))
+
+
+def closing_update(mask: np.ndarray, output: np.ndarray, kernel: np.ndarray, dirty: tuple, rectangles: list = None):
+    """
+    :param mask: the changed source image
+    :param output: the closed previous source, updated in place to closing(mask, kernel)
+    :param kernel: the kernel used to close the source
+    :param dirty: the rectangle (x_min, x_max, y_min, y_max) containing every changed pixel, see dirty_rectangle
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :return: the rectangle of the output which was recomputed or None if nothing changed
+    """
+    return _update(mask, output, kernel, dirty, rectangles, (_hit,))
+
+
+def dilation_update(mask: np.ndarray, output: np.ndarray, kernel: np.ndarray, dirty: tuple,
+                    rectangles: list = None):
+    """
+    :param mask: the changed source image
+    :param output: the dilated previous source, updated in place to dilation(mask, kernel)
+    :param kernel: the kernel used to dilate the source
+    :param dirty: the rectangle (x_min, x_max, y_min, y_max) containing every changed pixel, see dirty_rectangle
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :return: the rectangle of the output which was recomputed or None if nothing changed
+    """
+    return _update(mask, output, kernel, dirty, rectangles, (_hit, _fit))
+
+
+def erosion_update(mask: np.ndarray, output: np.ndarray, kernel: np.ndarray, dirty: tuple,
+                   rectangles: list = None):
+    """
+    :param mask: the changed source image
+    :param output: the eroded previous source, updated in place to erosion(mask, kernel)
+    :param kernel: the kernel used to erode the source
+    :param dirty: the rectangle (x_min, x_max, y_min, y_max) containing every changed pixel, see dirty_rectangle
+    :param rectangles: an optional decomposition of the kernel into rectangles, see decompose
+    :return: the rectangle of the output which was recomputed or None if nothing changed
+    """
+    return _update(mask, output, kernel, dirty, rectangles, (_fit, _hit))
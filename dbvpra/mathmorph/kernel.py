@@ -36,3 +36,24 @@ def point(r: int, tr: int) -> np.ndarray:
     patch = np.zeros((s, s), np.bool_)
     patch[l:u, l:u] = np.True_
     return patch
+
+
+def decompose(kernel: np.ndarray) -> list:
+    """
+    :param kernel: the kernel to decompose
+    :return: list of rectangles (x_min, x_max, y_min, y_max) whose union is the kernel
+    """
+    rectangles = []
+    open_runs = {}
+    for x in range(kernel.shape[0] + 1):
+        row = kernel[x] if x < kernel.shape[0] else np.zeros(kernel.shape[1], np.bool_)
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], row, [False])).astype(np.int8)))
+        runs = set(zip(edges[::2], edges[1::2]))
+
+        # a run of true pixels continues its rectangle as long as the next row has the same run
+        for run in set(open_runs) - runs:
+            rectangles.append((open_runs.pop(run), x) + tuple(int(i) for i in run))
+        for run in runs - set(open_runs):
+            open_runs[run] = x
+
+    return sorted(rectangles)
@@ -0,0 +1,183 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+
+from dbvpra.assert_util import assert_mask, assert_kernel
+
+_BITS = 64
+
+
+class PackedMask:
+    """
+    A bool mask with every row packed into uint64 words, 64 pixels per word.
+    Bit b of word w of a row holds column 64 * w + b, unused bits of the last word are zero.
+    """
+
+    def __init__(self, words: np.ndarray, shape: tuple):
+        """
+        :param words: the packed rows (rows x words) as uint64
+        :param shape: the shape of the unpacked mask
+        """
+        assert words.dtype == np.uint64, "The words need to be uint64!"
+        assert words.shape == (shape[0], -(-shape[1] // _BITS)), "The words need to match the shape!"
+
+        self.words = words
+        self.shape = tuple(shape)
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+
+def pack(mask: np.ndarray) -> PackedMask:
+    """
+    :param mask: the mask to pack
+    :return: the packed mask
+    """
+    assert_mask(mask)
+
+    n = -(-mask.shape[1] // _BITS)
+    packed = np.zeros((mask.shape[0], n * (_BITS >> 3)), np.uint8)
+    packed[:, :-(-mask.shape[1] // 8)] = np.packbits(mask, axis=1, bitorder='little')
+    return PackedMask(packed.view('<u8').astype(np.uint64, copy=False), mask.shape)
+
+
+def unpack(packed: PackedMask) -> np.ndarray:
+    """
+    :param packed: the packed mask
+    :return: the unpacked bool mask
+    """
+    words = packed.words.astype('<u8', copy=False).view(np.uint8)
+    return np.unpackbits(words, axis=1, count=packed.shape[1], bitorder='little').astype(np.bool_)
+
+
+def _columns(height: int, start: int, stop: int):
+    """
+    :param height: the number of columns
+    :param start: the first column to set
+    :param stop: the column after the last one to set
+    :return: the words with the bits of the columns start to stop set
+    """
+    columns = np.zeros(-(-height // _BITS) * _BITS, np.bool_)
+    columns[max(0, start):min(height, stop)] = np.True_
+    return pack(columns.reshape((1, -1))).words[0]
+
+
+def _edge(words: np.ndarray, column: int):
+    """
+    :param words: the packed rows
+    :param column: the column to replicate
+    :return: per row a word with all bits set to the bit of the column
+    """
+    bit = (words[:, column // _BITS] >> np.uint64(column % _BITS)) & np.uint64(1)
+    return np.zeros_like(bit) - bit
+
+
+def _shift(words: np.ndarray, offset: int, height: int):
+    """
+    :param words: the packed rows
+    :param offset: the column offset to read from, column y of the result is column y + offset
+    :param height: the number of columns
+    :return: the shifted words, columns beyond the edge replicate the edge like numpy.pad(mode='edge')
+    """
+    if offset == 0:
+        return words
+
+    n = words.shape[1]
+    q, b = divmod(abs(offset), _BITS)
+    zeros = np.zeros((words.shape[0], q + 1), np.uint64)
+
+    if offset > 0:
+        # move the bits towards lower columns
+        extended = np.concatenate((words, zeros), axis=1)
+        low, high = extended[:, q:q + n], extended[:, q + 1:q + 1 + n]
+        shifted = low >> np.uint64(b)
+        if b:
+            shifted |= high << np.uint64(_BITS - b)
+        fix, edge = _columns(height, height - offset, height), _edge(words, height - 1)
+    else:
+        # move the bits towards higher columns
+        extended = np.concatenate((zeros, words), axis=1)
+        low, high = extended[:, 1:1 + n], extended[:, :n]
+        shifted = low << np.uint64(b)
+        if b:
+            shifted |= high >> np.uint64(_BITS - b)
+        fix, edge = _columns(height, 0, -offset), _edge(words, 0)
+
+    shifted = (shifted & ~fix) | (edge[:, None] & fix)
+    return shifted & _columns(height, 0, height)
+
+
+def _morph(packed: PackedMask, kernel: np.ndarray, fit: bool):
+    """
+    :param packed: the packed mask
+    :param kernel: the kernel
+    :param fit: True to AND (opening) and False to OR (closing) over the kernel
+    :return: the packed result
+    """
+    assert isinstance(packed, PackedMask), "The Mask needs to be a PackedMask!"
+    assert_kernel(kernel)
+
+    """1. Invent some aliases for the algorithm"""
+    radius = kernel.shape[0] >> 1
+    (width, height) = packed.shape
+    rows = np.arange(width)
+
+    """2. The algorithm, 64 pixels per bitwise operation"""
+    destination = np.full(packed.words.shape, ~np.uint64(0) if fit else np.uint64(0), np.uint64)
+    for y in np.flatnonzero(kernel.any(axis=0)):
+        # one column shift per kernel column, the rows are shifted by indexing
+        shifted = _shift(packed.words, int(y) - radius, height)
+        for x in np.flatnonzero(kernel[:, y]):
+            part = shifted[np.clip(rows + int(x) - radius, 0, width - 1)]
+            if fit:
+                destination &= part
+            else:
+                destination |= part
+
+    return PackedMask(destination & _columns(height, 0, height), packed.shape)
+
+
+def opening_packed(packed: PackedMask, kernel: np.ndarray) -> PackedMask:
+    """
+    :param packed: the packed source image to open
+    :param kernel: the kernel used to open the source
+    :return: the packed opened source, equal to pack(opening(unpack(packed), kernel))
+    """
+    return _morph(packed, kernel, True)
+
+
+def closing_packed(packed: PackedMask, kernel: np.ndarray) -> PackedMask:
+    """
+    :param packed: the packed source image to close
+    :param kernel: the kernel used to close the source
+    :return: the packed closed source, equal to pack(closing(unpack(packed), kernel))
+    """
+    return _morph(packed, kernel, False)
+
+
+def dilation_packed(packed: PackedMask, kernel: np.ndarray) -> PackedMask:
+    """
+    :param packed: the packed source image to dilate
+    :param kernel: the kernel used to dilate the source
+    :return: the packed dilated source, equal to pack(dilation(unpack(packed), kernel))
+    """
+    return opening_packed(closing_packed(packed, kernel), kernel)
+
+
+def erosion_packed(packed: PackedMask, kernel: np.ndarray) -> PackedMask:
+    """
+    :param packed: the packed source image to erode
+    :param kernel: the kernel used to erode the source
+    :return: the packed eroded source, equal to pack(erosion(unpack(packed), kernel))
+    """
+    return closing_packed(opening_packed(packed, kernel), kernel)
@@ -0,0 +1,180 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+
+from dbvpra.assert_util import assert_mask, assert_kernel
+from dbvpra.mathmorph.util import _decomposed, _rectangles, _shifted
+
+
+def _replicate(buffer: np.ndarray, halo: int):
+    """
+    refills the halo of the buffer in place like numpy.pad(mode='edge') of its interior
+
+    :param buffer: the buffer with a halo around its interior
+    :param halo: the size of the halo
+    """
+    if halo == 0:
+        return
+    buffer[:halo, halo:-halo] = buffer[halo, halo:-halo]
+    buffer[-halo:, halo:-halo] = buffer[-halo - 1, halo:-halo]
+    buffer[:, :halo] = buffer[:, halo:halo + 1]
+    buffer[:, -halo:] = buffer[:, -halo - 1:-halo]
+
+
+class Morphology:
+    """
+    A chain of morphological operations which validates the kernels once, pads the mask once
+    and runs every stage between preallocated buffers.
+
+    pipeline = Morphology().erosion(cross(3, 1)).dilation(cross(3, 1))
+    result = pipeline(mask)
+    """
+
+    def __init__(self):
+        self._stages = []
+        self._halo = 0
+        self._buffers = []
+
+    def _append(self, stage: str, kernel: np.ndarray):
+        """
+        :param stage: the name of the stage
+        :param kernel: the kernel of the stage
+        :return: the pipeline itself for chaining
+        """
+        assert_kernel(kernel)
+        self._stages.append((stage, kernel, _decomposed(kernel)))
+        self._halo = max(self._halo, kernel.shape[0] >> 1)
+        return self
+
+    def opening(self, kernel: np.ndarray):
+        """
+        :param kernel: the kernel used to open the mask
+        :return: the pipeline itself for chaining
+        """
+        return self._append('opening', kernel)
+
+    def closing(self, kernel: np.ndarray):
+        """
+        :param kernel: the kernel used to close the mask
+        :return: the pipeline itself for chaining
+        """
+        return self._append('closing', kernel)
+
+    def dilation(self, kernel: np.ndarray):
+        """
+        :param kernel: the kernel used to dilate the mask
+        :return: the pipeline itself for chaining
+        """
+        return self._append('closing', kernel)._append('opening', kernel)
+
+    def erosion(self, kernel: np.ndarray):
+        """
+        :param kernel: the kernel used to erode the mask
+        :return: the pipeline itself for chaining
+        """
+        return self._append('opening', kernel)._append('closing', kernel)
+
+    def gradient(self, kernel: np.ndarray):
+        """
+        :param kernel: the kernel of the gradient
+        :return: the pipeline itself for chaining, the stage keeps the pixels set by closing but not by opening
+        """
+        return self._append('gradient', kernel)
+
+    def top_hat(self, kernel: np.ndarray):
+        """
+        :param kernel: the kernel of the top hat
+        :return: the pipeline itself for chaining, the stage keeps the pixels of the mask removed by erosion
+        """
+        return self._append('top_hat', kernel)
+
+    def black_hat(self, kernel: np.ndarray):
+        """
+        :param kernel: the kernel of the black hat
+        :return: the pipeline itself for chaining, the stage keeps the pixels added to the mask by dilation
+        """
+        return self._append('black_hat', kernel)
+
+    def _allocate(self, shape: tuple):
+        """
+        :param shape: the shape of the mask
+        :return: the three padded buffers and the contiguous work buffer, reused while the shape stays the same
+        """
+        padded = (shape[0] + 2 * self._halo, shape[1] + 2 * self._halo)
+        if not self._buffers or self._buffers[0].shape != padded:
+            self._buffers = [np.empty(padded, np.bool_) for _ in range(3)] + [np.empty(shape, np.bool_)]
+        return self._buffers
+
+    def _run(self, source: np.ndarray, destination: np.ndarray, kernel: np.ndarray, rectangles, ufunc):
+        """
+        :param source: the padded buffer to read from
+        :param destination: the padded buffer to write the interior and the halo of
+        :param kernel: the kernel
+        :param rectangles: the decomposition of the kernel or None to shift every true kernel pixel
+        :param ufunc: numpy.minimum to fit or numpy.maximum to hit
+        """
+        halo, radius = self._halo, kernel.shape[0] >> 1
+        (width, height) = (source.shape[0] - 2 * halo, source.shape[1] - 2 * halo)
+        padded = source[halo - radius:halo + width + radius, halo - radius:halo + height + radius]
+        # the ufuncs run about twice as fast on the contiguous work buffer than on the strided interior
+        work = self._buffers[3]
+
+        if rectangles is not None:
+            _rectangles(padded, rectangles, width, height, ufunc, work)
+        else:
+            _shifted(padded, kernel, width, height, ufunc, work)
+        destination[halo:halo + width, halo:halo + height] = work
+        _replicate(destination, halo)
+
+    def __call__(self, mask: np.ndarray, out: np.ndarray = None):
+        """
+        :param mask: the mask to run the pipeline on
+        :param out: an optional destination of the shape of the mask
+        :return: the result of every stage applied in order
+        """
+        assert_mask(mask)
+        assert out is None or out.shape == mask.shape, "The Destination needs to have the shape of the Mask!"
+
+        """1. Invent some aliases for the algorithm"""
+        halo = self._halo
+        (width, height) = mask.shape
+        current, other, scratch, _ = self._allocate(mask.shape)
+
+        """2. Pad the source once with a halo big enough for every stage"""
+        current[halo:halo + width, halo:halo + height] = mask
+        _replicate(current, halo)
+
+        """3. The algorithm, ping pong between the buffers"""
+        for stage, kernel, rectangles in self._stages:
+            if stage == 'opening':
+                self._run(current, other, kernel, rectangles, np.minimum)
+            elif stage == 'closing':
+                self._run(current, other, kernel, rectangles, np.maximum)
+            elif stage == 'gradient':
+                self._run(current, other, kernel, rectangles, np.maximum)
+                self._run(current, scratch, kernel, rectangles, np.minimum)
+                np.greater(other, scratch, out=other)
+            elif stage == 'top_hat':
+                self._run(current, other, kernel, rectangles, np.minimum)
+                self._run(other, scratch, kernel, rectangles, np.maximum)
+                np.greater(current, scratch, out=other)
+            elif stage == 'black_hat':
+                self._run(current, other, kernel, rectangles, np.maximum)
+                self._run(other, scratch, kernel, rectangles, np.minimum)
+                np.greater(scratch, current, out=other)
+            current, other = other, current
+
+        result = current[halo:halo + width, halo:halo + height]
+        if out is None:
+            return np.copy(result)
+        out[...] = result
+        return out
@@ -0,0 +1,64 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+from scipy import ndimage
+
+from dbvpra.assert_util import assert_mask
+
+# the neighbourhoods of the 4 and 8 connectivity
+_STRUCTURES = {
+    4: ndimage.generate_binary_structure(2, 1),
+    8: ndimage.generate_binary_structure(2, 2),
+}
+
+
+def reconstruct(marker: np.ndarray, mask: np.ndarray, connectivity: int = 4):
+    """
+    :param marker: the mask of the seeds to grow from
+    :param mask: the mask limiting the growth
+    :param connectivity: 4 or 8, the neighbours a pixel grows into
+    :return: the reconstruction by dilation of marker under mask, every pixel of mask connected to the marker
+    """
+
+    assert_mask(marker)
+    assert_mask(mask)
+    assert marker.shape == mask.shape, "The Marker and Mask need to have the same shape!"
+    assert connectivity in _STRUCTURES, "The connectivity needs to be 4 or 8!"
+
+    """1. Label the connected components of the mask, every pixel is visited a bounded number of times"""
+    labels, count = ndimage.label(mask, _STRUCTURES[connectivity])
+
+    """2. Keep the components hit by the marker"""
+    keep = np.zeros(count + 1, np.bool_)
+    keep[labels[marker]] = np.True_
+    keep[0] = np.False_
+
+    return keep[labels]
+
+
+def fill_holes(mask: np.ndarray, connectivity: int = 4):
+    """
+    :param mask: the mask to fill the holes of
+    :param connectivity: 4 or 8, the connectivity of the background
+    :return: the mask with every background region not connected to the border filled
+    """
+
+    assert_mask(mask)
+
+    """1. The background seen from the border"""
+    background = ~mask
+    border = np.zeros(mask.shape, np.bool_)
+    border[[0, -1]] = np.True_
+    border[:, [0, -1]] = np.True_
+
+    """2. Everything not reached from the border is the mask or a hole"""
+    return ~reconstruct(border & background, background, connectivity)
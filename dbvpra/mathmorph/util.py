@@ -0,0 +1,192 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dbvpra.mathmorph.kernel import decompose
+
+# the number of pixels from which on masks are split into strips for the thread pool
+_PARALLEL_PIXELS = 1 << 20
+
+
+def _identity(dtype, ufunc):
+    """
+    :param dtype: the type of the elements
+    :param ufunc: numpy.minimum or numpy.maximum
+    :return: the element which does not change the result of ufunc
+    """
+    if np.dtype(dtype) == np.bool_:
+        return ufunc is np.minimum
+    if np.issubdtype(dtype, np.floating):
+        return np.inf if ufunc is np.minimum else -np.inf
+    info = np.iinfo(dtype)
+    return info.max if ufunc is np.minimum else info.min
+
+
+def _running(array: np.ndarray, length: int, axis: int, ufunc):
+    """
+    van Herk/Gil-Werman running minimum or maximum with O(1) operations per element for every length
+
+    :param array: the array to filter
+    :param length: the length of the window
+    :param axis: the axis to run along
+    :param ufunc: numpy.minimum or numpy.maximum
+    :return: the ufunc of every window along the axis, shorter by length - 1
+    """
+    array = np.moveaxis(array, axis, 0)
+    n = array.shape[0] - length + 1
+    if length == 1:
+        return np.moveaxis(array[:n], 0, axis)
+
+    # pad to whole blocks of the window length
+    m = -(-array.shape[0] // length) * length
+    blocks = np.full((m,) + array.shape[1:], _identity(array.dtype, ufunc), array.dtype)
+    blocks[:array.shape[0]] = array
+    blocks = blocks.reshape((m // length, length) + array.shape[1:])
+
+    # every window spans the suffix of one block and the prefix of the next
+    prefix = ufunc.accumulate(blocks, axis=1).reshape((m,) + array.shape[1:])
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape((m,) + array.shape[1:])
+
+    return np.moveaxis(ufunc(suffix[:n], prefix[length - 1:length - 1 + n]), 0, axis)
+
+
+def _rectangles(padded: np.ndarray, rectangles: list, width: int, height: int, ufunc, out: np.ndarray = None):
+    """
+    :param padded: the mask or image padded by half the kernel size
+    :param rectangles: the decomposition of the kernel (x_min, x_max, y_min, y_max)
+    :param width: the width of the unpadded mask
+    :param height: the height of the unpadded mask
+    :param ufunc: numpy.minimum to fit or numpy.maximum to hit
+    :param out: an optional destination of the size width x height
+    :return: the ufunc over the kernel at every position, separated into two runs per rectangle
+    """
+    destination = np.empty((width, height) + padded.shape[2:], padded.dtype) if out is None else out
+    destination[...] = _identity(padded.dtype, ufunc)
+    for x_min, x_max, y_min, y_max in rectangles:
+        part = padded[x_min:x_max - 1 + width, y_min:y_max - 1 + height]
+        part = _running(part, x_max - x_min, 0, ufunc)
+        part = _running(part, y_max - y_min, 1, ufunc)
+        ufunc(destination, part, out=destination)
+    return destination
+
+
+def _shifted(padded: np.ndarray, kernel: np.ndarray, width: int, height: int, ufunc, out: np.ndarray = None):
+    """
+    :param padded: the mask or image padded by half the kernel size
+    :param kernel: the kernel
+    :param width: the width of the unpadded mask
+    :param height: the height of the unpadded mask
+    :param ufunc: numpy.minimum to fit or numpy.maximum to hit
+    :param out: an optional destination of the size width x height
+    :return: the ufunc over the kernel at every position, one shifted view per true kernel pixel
+    """
+    destination = np.empty((width, height) + padded.shape[2:], padded.dtype) if out is None else out
+    destination[...] = _identity(padded.dtype, ufunc)
+    for x, y in zip(*np.nonzero(kernel)):
+        ufunc(destination, padded[x:x + width, y:y + height], out=destination)
+    return destination
+
+
+def _decomposed(kernel: np.ndarray):
+    """
+    :param kernel: the kernel to decompose
+    :return: the decomposition of the kernel into rectangles
+             or None if shifting every true kernel pixel is cheaper
+    """
+    rectangles = decompose(kernel)
+    # two running passes cost about as much as six shifted views
+    return rectangles if 6 * len(rectangles) < np.count_nonzero(kernel) else None
+
+
+def _strips(core, padded: np.ndarray, radius: int, width: int, height: int, out: np.ndarray, workers: int):
+    """
+    :param core: the function computing (padded, width, height, out) of one strip
+    :param padded: the mask or image padded by the kernel radius
+    :param radius: the kernel radius, the halo every strip reads above and below its rows
+    :param width: the width of the unpadded mask
+    :param height: the height of the unpadded mask
+    :param out: an optional destination of the size width x height
+    :param workers: the number of threads, None for all cores
+    :return: the destination, every strip of rows computed on its own thread
+    """
+    workers = os.cpu_count() if workers is None else workers
+    strips = min(workers, width)
+    if strips <= 1 or width * height < _PARALLEL_PIXELS:
+        return core(padded, width, height, out)
+
+    destination = np.empty((width, height) + padded.shape[2:], padded.dtype) if out is None else out
+    bounds = np.linspace(0, width, strips + 1).astype(int)
+
+    def strip(x_min: int, x_max: int):
+        # the numpy kernels release the gil, the strips only share the read only source
+        core(padded[x_min:x_max + 2 * radius], x_max - x_min, height, destination[x_min:x_max])
+
+    with ThreadPoolExecutor(strips) as executor:
+        list(executor.map(strip, bounds[:-1], bounds[1:]))
+
+    return destination
+
+
+def _morph(padded: np.ndarray, kernel: np.ndarray, width: int, height: int, rectangles, ufunc,
+           out: np.ndarray, workers: int):
+    """
+    :param padded: the mask or image padded by half the kernel size
+    :param kernel: the kernel
+    :param width: the width of the unpadded mask
+    :param height: the height of the unpadded mask
+    :param rectangles: an optional decomposition of the kernel, None to detect it
+    :param ufunc: numpy.minimum to fit or numpy.maximum to hit
+    :param out: an optional destination of the size width x height
+    :param workers: the number of threads, None for all cores
+    :return: the ufunc over the kernel at every position
+    """
+    rectangles = _decomposed(kernel) if rectangles is None else rectangles
+    if rectangles is not None:
+        def core(part, w, h, destination):
+            return _rectangles(part, rectangles, w, h, ufunc, destination)
+    else:
+        def core(part, w, h, destination):
+            return _shifted(part, kernel, w, h, ufunc, destination)
+
+    return _strips(core, padded, kernel.shape[0] >> 1, width, height, out, workers)
+
+
+def _fit(padded: np.ndarray, kernel: np.ndarray, width: int, height: int, rectangles: list = None,
+         out: np.ndarray = None, workers: int = 1):
+    """
+    :param padded: the mask or image padded by half the kernel size
+    :param kernel: the kernel to fit
+    :param width: the width of the unpadded mask
+    :param height: the height of the unpadded mask
+    :param rectangles: an optional decomposition of the kernel, None to detect it
+    :param out: an optional destination of the size width x height
+    :param workers: the number of threads, None for all cores
+    :return: the mask of the positions where every true kernel pixel lies on a true mask pixel
+    """
+    return _morph(padded, kernel, width, height, rectangles, np.minimum, out, workers)
+
+
+def _hit(padded: np.ndarray, kernel: np.ndarray, width: int, height: int, rectangles: list = None,
+         out: np.ndarray = None, workers: int = 1):
+    """
+    :param padded: the mask or image padded by half the kernel size
+    :param kernel: the kernel to hit with
+    :param width: the width of the unpadded mask
+    :param height: the height of the unpadded mask
+    :param rectangles: an optional decomposition of the kernel, None to detect it
+    :param out: an optional destination of the size width x height
+    :param workers: the number of threads, None for all cores
+    :return: the mask of the positions where any true kernel pixel lies on a true mask pixel
+    """
+    return _morph(padded, kernel, width, height, rectangles, np.maximum, out, workers)
@@ -0,0 +1,63 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import numpy as np
+
+# the float type used to compute with images which are not float32 already
+_float_precision = np.float64
+
+
+def float_precision():
+    """
+    :return: the float type used to compute with float64 and uint8 images
+    """
+    return _float_precision
+
+
+def set_float_precision(dtype):
+    """
+    :param dtype: the float type used to compute with float64 and uint8 images (numpy.float64 or numpy.float32)
+    """
+    global _float_precision
+
+    assert dtype in (np.float64, np.float32), "The precision needs to be numpy.float64 or numpy.float32!"
+    _float_precision = np.dtype(dtype).type
+
+
+def _float_dtype(image: np.ndarray):
+    """
+    :param image: the image to compute with
+    :return: the float type to compute with the image in
+    """
+    return np.float32 if image.dtype == np.float32 else _float_precision
+
+
+def _to_float(image: np.ndarray, dtype=None):
+    """
+    :param image: the float or uint8 image to convert
+    :param dtype: the float type to convert to, None for the precision of the image
+    :return: the image as float in [0, 1], not copied if it already is
+    """
+    dtype = _float_dtype(image) if dtype is None else dtype
+    if image.dtype == np.uint8:
+        return image.astype(dtype) / dtype(255)
+    return np.asarray(image, dtype=dtype)
+
+
+def _from_float(image: np.ndarray, like: np.ndarray):
+    """
+    :param image: the float image in [0, 1] to convert
+    :param like: the image with the type to convert to
+    :return: the image with the type of like
+    """
+    if like.dtype == np.uint8:
+        return np.rint(np.clip(image, 0, 1) * 255).astype(np.uint8)
+    return image.astype(like.dtype, copy=False)
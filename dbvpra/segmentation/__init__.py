@@ -8,7 +8,8 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+from dbvpra.segmentation.cache import *
 from dbvpra.segmentation.nn_segmentation import *
 from dbvpra.segmentation.patchify import *
 
-__all__ = ['nn_segmentation_from_masks']
+__all__ = ['nn_segmentation_from_masks', 'SegmentationCache']
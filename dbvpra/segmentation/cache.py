@@ -0,0 +1,104 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from dbvpra.assert_util import assert_mask, assert_kernel_size
+from dbvpra.segmentation.nn_segmentation import _SegmentationNN, _train
+
+
+class SegmentationCache:
+    """
+    LRU cache of the segmentation networks trained in a session.
+    The networks are keyed by the image and the kernel size, so segmenting
+    the same image again only fine tunes the network on the new scribbles.
+    The cache never remembers scribbles which are not passed in, callers keep their strokes themselves.
+    """
+
+    def __init__(self, max_entries: int = 4, fine_tune_steps: int = 300, replay: int = 256):
+        """
+        :param max_entries: the number of networks to keep
+        :param fine_tune_steps: the maximal number of optimizer steps to fine tune on new scribbles
+        :param replay: the number of previous scribbles per class trained alongside the new ones
+        """
+        assert max_entries >= 0, "The number of entries needs to be positive!"
+
+        self.max_entries = max_entries
+        self.fine_tune_steps = fine_tune_steps
+        self.replay = replay
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _replayed(self, added: np.ndarray, kept: np.ndarray):
+        """
+        :param added: the mask of the newly scribbled pixels of a class
+        :param kept: the mask of the previous scribbles of a class
+        :return: the indices of the added pixels and of a random sample of the kept ones in row major order
+        """
+        kept = np.flatnonzero(kept)
+        kept = kept[torch.randperm(len(kept))[:self.replay].numpy()]
+        return np.concatenate((np.flatnonzero(added), kept))
+
+    def network(self, image: np.ndarray, kernel_size: int, keep_mask: np.ndarray, dump_mask: np.ndarray,
+                training: str = 'batches', time_budget: float = None):
+        """
+        :param image: the float32 image to segment
+        :param kernel_size: the size of the kernel
+        :param keep_mask: the mask of pixels to keep
+        :param dump_mask: the mask of pixels to dump
+        :param training: 'batches' or 'full' to train a new network, fine tuning always uses 'batches'
+        :param time_budget: the maximal number of seconds to train with 'batches', None for the step budget only
+        :return: the trained network, fine tuned on the pixels scribbled since the last call with the same image
+                 or trained anew once scribbles of that call were removed
+        """
+
+        assert_kernel_size(kernel_size)
+        assert_mask(keep_mask)
+        assert_mask(dump_mask)
+
+        key = (kernel_size, image.shape, image.dtype.str, hashlib.sha1(image.tobytes()).digest())
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            net, previous_keep, previous_dump = entry
+            added_keep, added_dump = keep_mask & ~previous_keep, dump_mask & ~previous_dump
+
+            # the network can not unlearn removed scribbles, those are trained anew like without the cache
+            if (previous_keep & ~keep_mask).any() or (previous_dump & ~dump_mask).any():
+                del self._entries[key]
+                entry = None
+            elif added_keep.any() or added_dump.any():
+                _train(net, image, kernel_size,
+                       self._replayed(added_keep, previous_keep),
+                       self._replayed(added_dump, previous_dump),
+                       'batches', time_budget, self.fine_tune_steps)
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+        else:
+            net = _SegmentationNN(kernel_size)
+            _train(net, image, kernel_size, np.flatnonzero(keep_mask), np.flatnonzero(dump_mask),
+                   training, time_budget)
+
+        self._entries[key] = (net, keep_mask.copy(), dump_mask.copy())
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return net
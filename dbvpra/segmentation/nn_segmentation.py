@@ -8,13 +8,16 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+import time
+
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as f
 
 from dbvpra.assert_util import assert_rgb_image, assert_mask, assert_image_mask, assert_kernel_size
-from dbvpra.segmentation.patchify import _patchify_info
+from dbvpra.precision.util import _to_float
+from dbvpra.segmentation.patchify import _patchify_info_chunks, _patchify_info_rows
 
 
 class _SegmentationNN(nn.Module):
@@ -37,6 +40,7 @@ class _SegmentationNN(nn.Module):
         hidden = ((kernel_size + 1) ** 2) * channel + coordinates
         output = 1
 
+        self.kernel_size = kernel_size
         self.inputs = nn.Linear(inputs, hidden)
         self.hidden = nn.Linear(hidden, output)
 
@@ -51,6 +55,54 @@ class _SegmentationNN(nn.Module):
         return x
 
 
+class _SegmentationFCN(nn.Module):
+    """
+    The fully convolutional form of a trained _SegmentationNN. The linear layer over the k x k x 3 patch
+    is a k x k convolution, the linear layer over the hidden units a 1 x 1 convolution
+    and the weights of the coordinates are added as per row and per column planes.
+    """
+
+    def __init__(self, net: _SegmentationNN):
+        """
+        :param net: the trained network to convert
+        """
+
+        nn.Module.__init__(self)
+
+        kernel_size = net.kernel_size
+        channel = 3
+        hidden = net.inputs.out_features
+
+        self.inputs = nn.Conv2d(channel, hidden, kernel_size)
+        self.hidden = nn.Conv2d(hidden, 1, 1)
+
+        with torch.no_grad():
+            # the patches are flattened as (x, y, channel)
+            weight = net.inputs.weight[:, :-2].reshape((hidden, kernel_size, kernel_size, channel))
+            self.inputs.weight.copy_(weight.permute(0, 3, 1, 2))
+            self.inputs.bias.copy_(net.inputs.bias)
+            self.hidden.weight.copy_(net.hidden.weight.reshape((1, hidden, 1, 1)))
+            self.hidden.bias.copy_(net.hidden.bias)
+
+        self.register_buffer('coordinates', net.inputs.weight[:, -2:].detach().clone())
+
+    def forward(self, x, x_min: int = 0):
+        """
+        :param x: the edge padded image as tensor (1, 3, width + k - 1, height + k - 1)
+        :param x_min: the x coordinate of the first row, to run the network on strips of an image
+        :return: the output of the network for every pixel as tensor (1, 1, width, height)
+        """
+
+        x = self.inputs(x)
+        rows = torch.arange(x_min, x_min + x.shape[2], dtype=x.dtype)
+        columns = torch.arange(x.shape[3], dtype=x.dtype)
+        x += self.coordinates[:, 0, None, None] * rows[:, None]
+        x += self.coordinates[:, 1, None, None] * columns
+        x = self.hidden(f.relu(x, inplace=True))
+
+        return x
+
+
 def _train_segmentation_nn(net: _SegmentationNN, inputs, labels, max_iterations=3000, break_precision=1e-3):
     """
     TODO document
@@ -73,12 +125,215 @@ def _train_segmentation_nn(net: _SegmentationNN, inputs, labels, max_iterations=
             break
 
 
-def nn_segmentation_from_masks(image: np.ndarray, kernel_size: int, keep_mask: np.ndarray, dump_mask: np.ndarray):
+def _balanced_batches(labels, batch_size: int):
+    """
+    :param labels: the labels (n, 1), 1 to keep and 0 to dump
+    :param batch_size: the number of samples per batch, split evenly between the classes present
+    :return: endless generator of index tensors, every class is drawn from a shuffled permutation
+    """
+    classes = [torch.nonzero(labels[:, 0] == label, as_tuple=False)[:, 0] for label in (1, 0)]
+    classes = [indices for indices in classes if len(indices) > 0]
+    share = max(1, batch_size // max(1, len(classes)))
+
+    permutations = [indices[torch.randperm(len(indices))] for indices in classes]
+    positions = [0] * len(classes)
+
+    while True:
+        batch = []
+        for c, indices in enumerate(classes):
+            taken = []
+            # small classes are not drawn more than once per batch
+            count = min(share, len(indices))
+            while count > 0:
+                # reshuffle a class once all of its samples were drawn
+                if positions[c] == len(indices):
+                    permutations[c] = indices[torch.randperm(len(indices))]
+                    positions[c] = 0
+                part = permutations[c][positions[c]:positions[c] + count]
+                positions[c] += len(part)
+                count -= len(part)
+                taken.append(part)
+            batch.extend(taken)
+        yield torch.cat(batch)
+
+
+def _train_segmentation_nn_batches(net: _SegmentationNN, inputs, labels, batch_size: int = 256, max_steps: int = 3000,
+                                   time_budget: float = None, validation: float = 0.1, patience: int = 10,
+                                   evaluate_every: int = 25, break_precision: float = 1e-3):
+    """
+    :param net: the network to train
+    :param inputs: the patch info of the scribbled pixels
+    :param labels: the labels (n, 1), 1 to keep and 0 to dump
+    :param batch_size: the number of samples per step, balanced between keep and dump
+    :param max_steps: the maximal number of optimizer steps
+    :param time_budget: the maximal number of seconds to train, None for no limit
+    :param validation: the fraction of every class held out to stop early, at most batch_size samples per class
+    :param patience: the number of evaluations without improvement before stopping
+    :param evaluate_every: the number of steps between two evaluations of the held out samples
+    :param break_precision: the loss of a batch to stop at
+    :return: statistics of the training as dict with steps, converged, seconds and the best validation loss
+    """
+    start = time.perf_counter()
+    loss_func = nn.BCEWithLogitsLoss()
+    optimizer = torch.optim.Adam(net.parameters())
+
+    ###
+    # hold out a slice of every class
+
+    held_out = []
+    train = []
+    for label in (1, 0):
+        indices = torch.nonzero(labels[:, 0] == label, as_tuple=False)[:, 0]
+        indices = indices[torch.randperm(len(indices))]
+        count = min(int(len(indices) * validation), batch_size) if len(indices) > 1 else 0
+        held_out.append(indices[:count])
+        train.append(indices[count:])
+    held_out, train = torch.cat(held_out), torch.cat(train)
+
+    train_inputs, train_labels = inputs[train], labels[train]
+    held_out_inputs, held_out_labels = inputs[held_out], labels[held_out]
+
+    ###
+    # shuffled and class balanced mini batches
+
+    best_loss, best_state, evaluations = float('inf'), None, 0
+    steps, converged = 0, False
+    batches = _balanced_batches(train_labels, batch_size)
+    while steps < max_steps and len(train) > 0:
+        if time_budget is not None and time.perf_counter() - start >= time_budget:
+            break
+
+        batch = next(batches)
+        optimizer.zero_grad()
+        loss = loss_func(net(train_inputs[batch]), train_labels[batch])
+        loss.backward()
+        optimizer.step()
+        steps += 1
+
+        if loss.item() < break_precision:
+            converged = True
+            break
+
+        # early stopping on the held out scribbles, the best weights are kept
+        if len(held_out) > 0 and steps % evaluate_every == 0:
+            with torch.no_grad():
+                held_out_loss = loss_func(net(held_out_inputs), held_out_labels).item()
+            if held_out_loss < best_loss:
+                best_loss, evaluations = held_out_loss, 0
+                best_state = {key: value.clone() for key, value in net.state_dict().items()}
+            else:
+                evaluations += 1
+                if evaluations >= patience:
+                    break
+
+    # a converged network is kept, otherwise the weights which did best on the held out scribbles
+    if best_state is not None and not converged:
+        net.load_state_dict(best_state)
+
+    return {
+        'steps': steps,
+        'converged': converged,
+        'seconds': time.perf_counter() - start,
+        'validation_loss': best_loss if best_state is not None else None,
+    }
+
+
+def _segment_convolutional(net: _SegmentationNN, image: np.ndarray, kernel_size: int, chunk_size: int):
+    """
+    :param net: the trained network
+    :param image: the float32 image to segment
+    :param kernel_size: the size of the kernel
+    :param chunk_size: the number of pixels run through the network at once, rounded to whole rows
+    :return: the mask of the pixels to keep, computed by convolutions on strips of the image without any patches
+    """
+    fcn = _SegmentationFCN(net)
+    pad = kernel_size >> 1
+    (width, height) = image.shape[:2]
+    padded = np.pad(image, ((pad, pad), (pad, pad), (0, 0)), mode='edge')
+
+    result = np.empty((width, height), np.bool_)
+    rows = max(1, chunk_size // height)
+
+    with torch.no_grad():
+        for x_min in range(0, width, rows):
+            x_max = min(width, x_min + rows)
+            strip = torch.from_numpy(padded[x_min:x_max + 2 * pad]).permute(2, 0, 1)[None]
+            result[x_min:x_max] = fcn(strip, x_min)[0, 0].numpy() >= 0.5
+
+    return result
+
+
+def _segment_patches(net: _SegmentationNN, image: np.ndarray, kernel_size: int, chunk_size: int):
+    """
+    :param net: the trained network
+    :param image: the float32 image to segment
+    :param kernel_size: the size of the kernel
+    :param chunk_size: the number of pixels run through the network at once
+    :return: the mask of the pixels to keep, the memory stays bounded by the chunk size
+    """
+    result = np.empty(image.shape[0] * image.shape[1], np.bool_)
+
+    # torch 1.7 has no inference_mode yet, no_grad keeps the autograd graph from being recorded as well
+    with torch.no_grad():
+        for start, info in _patchify_info_chunks(image, kernel_size, chunk_size):
+            result[start:start + len(info)] = net(torch.from_numpy(info)).numpy()[:, 0] >= 0.5
+
+    return result.reshape(image.shape[:2])
+
+
+_TRAININGS = ('batches', 'full')
+
+
+def _train(net: _SegmentationNN, image: np.ndarray, kernel_size: int, keep_rows: np.ndarray, dump_rows: np.ndarray,
+           training: str = 'batches', time_budget: float = None, max_steps: int = 3000):
+    """
+    :param net: the network to train
+    :param image: the float32 image
+    :param kernel_size: the size of the kernel
+    :param keep_rows: the indices of the pixels to keep in row major order
+    :param dump_rows: the indices of the pixels to dump in row major order
+    :param training: 'batches' or 'full', see nn_segmentation_from_masks
+    :param time_budget: the maximal number of seconds to train with 'batches', None for the step budget only
+    :param max_steps: the maximal number of optimizer steps with 'batches'
+    """
+
+    # only the patches of the scribbled pixels are materialized for the training
+    keep_info = _patchify_info_rows(image, kernel_size, keep_rows)
+    dump_info = _patchify_info_rows(image, kernel_size, dump_rows)
+    inputs = torch.from_numpy(np.concatenate((keep_info, dump_info)))
+
+    keep = np.ones((len(keep_info)), dtype=int)
+    dump = np.zeros((len(dump_info)), dtype=int)
+    labels = np.append(keep, dump).reshape(len(keep_info) + len(dump_info), 1)
+    labels = torch.from_numpy(labels).float()
+
+    if training == 'batches':
+        _train_segmentation_nn_batches(net, inputs, labels, max_steps=max_steps, time_budget=time_budget)
+    else:
+        _train_segmentation_nn(net, inputs, labels)
+
+
+_INFERENCES = {
+    'convolution': _segment_convolutional,
+    'patches': _segment_patches,
+}
+
+
+def nn_segmentation_from_masks(image: np.ndarray, kernel_size: int, keep_mask: np.ndarray, dump_mask: np.ndarray,
+                               chunk_size: int = 1 << 14, inference: str = 'convolution', training: str = 'batches',
+                               time_budget: float = None, cache=None):
     """
     :param image: The Image to segment from
     :param kernel_size: The Size of the Kernel
     :param keep_mask: The Mask of pixels to keep
     :param dump_mask: The Mask of pixels to dump
+    :param chunk_size: The number of pixels run through the network at once, bounds the memory of the inference
+    :param inference: 'convolution' to run the network as convolutions on the image
+                      or 'patches' to run it on the patch of every pixel
+    :param training: 'batches' to train on class balanced mini batches with early stopping
+                     or 'full' to train on every scribbled pixel at once
+    :param time_budget: The maximal number of seconds to train with 'batches', None for the step budget only
+    :param cache: An optional SegmentationCache to fine tune the network of the same image on the new scribbles
     :return: A Mask of pixels to keep.
              Pixels similar to keep_mask and different to to dump_pixels
     """
@@ -88,38 +343,24 @@ def nn_segmentation_from_masks(image: np.ndarray, kernel_size: int, keep_mask: n
     assert_mask(dump_mask)
     assert_image_mask(image, keep_mask)
     assert_image_mask(image, dump_mask)
+    assert inference in _INFERENCES, "The inference needs to be one of %s!" % ', '.join(_INFERENCES)
+    assert training in _TRAININGS, "The training needs to be one of %s!" % ', '.join(_TRAININGS)
 
     ###
-    # formatting the data
+    # formatting the data, the network computes in float32 anyway
 
-    patch_info = _patchify_info(image, kernel_size)
-
-    keep_info = patch_info[keep_mask.flatten()]
-    dump_info = patch_info[dump_mask.flatten()]
-    inputs = np.append([keep_info], [dump_info], axis=1)[0]
-    inputs = torch.from_numpy(inputs).float()
-
-    keep = np.ones((len(keep_info)), dtype=int)
-    dump = np.zeros((len(dump_info)), dtype=int)
-    labels = np.append(keep, dump).reshape(len(keep_info) + len(dump_info), 1)
-    labels = torch.from_numpy(labels).float()
-
-    patch_info = torch.from_numpy(patch_info).float()
+    image = _to_float(image, np.float32)
 
     ###
-    # training the network
+    # training the network, or fine tuning the one of the cache on the new scribbles
 
-    net = _SegmentationNN(kernel_size)
-    _train_segmentation_nn(net, inputs, labels)
+    if cache is None:
+        net = _SegmentationNN(kernel_size)
+        _train(net, image, kernel_size, np.flatnonzero(keep_mask), np.flatnonzero(dump_mask), training, time_budget)
+    else:
+        net = cache.network(image, kernel_size, keep_mask, dump_mask, training, time_budget)
 
     ###
     # running the network
 
-    result = net(patch_info)
-
-    result = result.detach()
-    result = result.numpy()
-    result = result >= 0.5
-    result = result.reshape(image.shape[0], image.shape[1])
-
-    return result
+    return _INFERENCES[inference](net, image, kernel_size, chunk_size)
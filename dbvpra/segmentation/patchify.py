@@ -9,6 +9,7 @@
 #  SOFTWARE.
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 
 from dbvpra.assert_util import assert_rgb_image, assert_mask, assert_image_mask, assert_kernel_size
 
@@ -17,7 +18,7 @@ def _patchify(image: np.ndarray, patch_size: int):
     """
     :param image: The Image to patchify
     :param patch_size: The size of the patches
-    :return: The patches as two dimensional array
+    :return: The patches as read only strided view (width, height, patch_size, patch_size, 3) of the padded image
     """
 
     assert_rgb_image(image)
@@ -27,15 +28,62 @@ def _patchify(image: np.ndarray, patch_size: int):
     patches_width = image.shape[0]
     patches_height = image.shape[1]
 
-    patches = np.empty((patches_width, patches_height, patch_size, patch_size, 3), np.float64)
     image = np.pad(image, ((patch_pad, patch_pad), (patch_pad, patch_pad), (0, 0)), mode='edge')
 
-    for x in range(0, patches_width):
-        for y in range(0, patches_height):
-            patch = image[x:x + patch_size, y:y + patch_size]
-            patches[x, y] = patch
+    # every patch shares the memory of the padded image, numpy 1.19 has no sliding_window_view yet
+    (sx, sy, sc) = image.strides
+    return as_strided(image, (patches_width, patches_height, patch_size, patch_size, 3), (sx, sy, sx, sy, sc),
+                      writeable=False)
 
-    return patches
+
+def _coordinates(image: np.ndarray):
+    """
+    :param image: The Image to generate the coordinates of
+    :return: The coordinates (x, y) of every pixel in row major order as two dimensional array
+    """
+    return np.indices(image.shape[:2], dtype=image.dtype).reshape((2, -1)).T
+
+
+def _info_rows(patches: np.ndarray, rows: np.ndarray):
+    """
+    :param patches: The patches as strided view, see _patchify
+    :param rows: The indices of the pixels in row major order to materialize the patch info of
+    :return: The patch info of the rows as two dimensional array
+    """
+
+    x, y = np.unravel_index(rows, patches.shape[:2])
+
+    info = np.empty((len(rows), int(np.prod(patches.shape[2:])) + 2), patches.dtype)
+    info[:, :-2] = patches[x, y].reshape((len(rows), info.shape[1] - 2))
+    info[:, -2] = x
+    info[:, -1] = y
+
+    return info
+
+
+def _patchify_info_rows(image: np.ndarray, kernel_size: int, rows: np.ndarray):
+    """
+    :param image: The Image to patchify
+    :param kernel_size: The size of the patches
+    :param rows: The indices of the pixels in row major order to materialize the patch info of
+    :return: The patch info of the rows as two dimensional array
+    """
+    return _info_rows(_patchify(image, kernel_size), rows)
+
+
+def _patchify_info_chunks(image: np.ndarray, kernel_size: int, chunk_size: int):
+    """
+    :param image: The Image to patchify
+    :param kernel_size: The size of the patches
+    :param chunk_size: The number of pixels per chunk
+    :return: Generator of the start row and the patch info of every chunk of pixels in row major order
+    """
+    assert chunk_size > 0, "The chunk size needs to be bigger than zero!"
+
+    patches = _patchify(image, kernel_size)
+    n = image.shape[0] * image.shape[1]
+    for start in range(0, n, chunk_size):
+        yield start, _info_rows(patches, np.arange(start, min(n, start + chunk_size)))
 
 
 def _patchify_info(image: np.ndarray, kernel_size: int):
@@ -45,15 +93,13 @@ def _patchify_info(image: np.ndarray, kernel_size: int):
     :return: The patch info as two dimensional array
     """
 
-    coordinates = [np.array([x, y], dtype=np.float64)
-                   for x in range(0, image.shape[0])
-                   for y in range(0, image.shape[1])]
-
     patches = _patchify(image, kernel_size)
 
-    patches = patches.reshape((image.shape[0] * image.shape[1], kernel_size * kernel_size * 3))
+    info = np.empty((image.shape[0] * image.shape[1], kernel_size * kernel_size * 3 + 2), image.dtype)
+    info[:, :-2].reshape(patches.shape)[...] = patches
+    info[:, -2:] = _coordinates(image)
 
-    return np.append(patches, coordinates, axis=1)
+    return info
 
 
 def _patchify_from_mask(image: np.ndarray, patch_size: int, mask: np.ndarray):
@@ -76,11 +122,10 @@ def _patchify_info_from_mask(image: np.ndarray, patch_size: int, mask: np.ndarra
     :param image: The Image to patchify
     :param patch_size: The size of the patches
     :param mask: The Mask to filter the patches
-    :return: The patch info as two dimensional array
+    :return: The patch info as two dimensional array, only the masked rows are materialized
     """
 
-    info = _patchify_info(image, patch_size)
     assert_mask(mask)
     assert_image_mask(image, mask)
 
-    return info[mask.flatten()]
+    return _patchify_info_rows(image, patch_size, np.flatnonzero(mask))
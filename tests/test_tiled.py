@@ -0,0 +1,41 @@
+#  Copyright (c) 2020 Robert Andreas Fritsch
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import tracemalloc
+
+import numpy as np
+
+from dbvpra.inpainting import inpainting_tiled
+
+
+def test_inpainting_tiled_memory_is_bounded_by_the_tile(tmp_path):
+    size, tile, halo = 2048, 128, 16
+
+    image = np.lib.format.open_memmap(str(tmp_path / 'image.npy'), 'w+', np.float32, (size, size, 3))
+    mask = np.lib.format.open_memmap(str(tmp_path / 'mask.npy'), 'w+', np.bool_, (size, size))
+    out = np.lib.format.open_memmap(str(tmp_path / 'out.npy'), 'w+', np.float32, (size, size, 3))
+
+    rng = np.random.default_rng(0)
+    for y in range(0, size, tile):
+        image[y:y + tile] = rng.random((tile, size, 3), np.float32)
+    mask[100:300, 100:300] = True
+    mask[1000:1100, 50:2000] = True
+
+    tracemalloc.start()
+    try:
+        inpainting_tiled(image, mask, out, tile=tile, halo=halo)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # a grown tile in double precision, the solver needs a small multiple of it
+    region = (tile + 2 * halo) ** 2 * 3 * np.dtype(np.float64).itemsize
+    assert peak < 16 * region < image.nbytes / 4
+    assert 0 <= out[mask].min() and out[mask].max() <= 1